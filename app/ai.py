@@ -0,0 +1,111 @@
+# app/ai.py
+
+import asyncio
+import hashlib
+import os
+
+from . import cache, metrics
+
+# --- CONFIGURATION ---
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# The Groq SDK also reads GROQ_BASE_URL, which is how tests point it at a fake server
+AI_MODEL = "llama-3.3-70b-versatile" # Fast & Free
+# Outbound LLM calls allowed at once across every route in this process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "512"))
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", "3600"))
+
+_client = None
+llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+analysis_cache = cache.TTLCache(ttl=ANALYSIS_CACHE_TTL, maxsize=ANALYSIS_CACHE_SIZE)
+analysis_flights = cache.SingleFlight()
+
+
+def get_client():
+    """The shared AsyncGroq client, created on first use; None when no key is configured."""
+    global _client
+    if _client is None and GROQ_API_KEY:
+        try:
+            # Imported here: the SDK (and its pydantic models) is a large share of cold-start import time
+            from groq import AsyncGroq
+            _client = AsyncGroq(api_key=GROQ_API_KEY)
+        except Exception:
+            print("Groq Client failed to initialize")
+    return _client
+
+
+async def complete(messages, **options):
+    async with llm_slots:
+        with metrics.timed("llm"):
+            chat_completion = await get_client().chat.completions.create(
+                messages=messages, model=AI_MODEL, **options
+            )
+    return chat_completion.choices[0].message.content
+
+async def stream(messages, **options):
+    """Yields content deltas as the model produces them; holds an LLM slot throughout."""
+    async with llm_slots:
+        with metrics.timed("llm_stream"):
+            chunks = await get_client().chat.completions.create(
+                messages=messages, model=AI_MODEL, stream=True, **options
+            )
+            async for chunk in chunks:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+
+
+# --- MARKET ANALYSIS ---
+def analysis_key(market):
+    # Any bet or edit to the description changes the key, so cached takes never go stale
+    description_hash = hashlib.sha1((market.description or "").encode("utf-8")).hexdigest()
+    return market.id, market.yes_pool, market.no_pool, description_hash
+
+def analysis_messages(market):
+    prompt = f"""
+    You are a professional prediction market analyst (like on Polymarket).
+    Market Question: "{market.question}"
+    Description: "{market.description}"
+    Category: {market.category}
+    Current Pool: {market.yes_pool + market.no_pool} coins.
+
+    Provide a concise, 2-3 sentence analysis of this event.
+    Focus on probabilities or key news factors to consider.
+    Do not be neutral—sound like a smart crypto trader.
+    """
+    return [{"role": "user", "content": prompt}]
+
+async def analyze(market):
+    """
+    Cached analysis for the market's current state. Identical requests that
+    arrive while one is in flight wait for it instead of calling the LLM again.
+    """
+    key = analysis_key(market)
+    content = analysis_cache.get(key)
+    if content is not None:
+        return content
+
+    messages = analysis_messages(market)
+    async def generate():
+        content = await complete(messages)
+        analysis_cache.set(key, content)
+        return content
+    return await asyncio.shield(analysis_flights.run(key, generate))
+
+async def analyze_stream(market):
+    """
+    Streaming variant of analyze(). A cached analysis is sent as one chunk;
+    otherwise tokens are relayed live and the full text is cached at the end.
+    Streams aren't coalesced with each other, but still share the LLM slots.
+    """
+    key = analysis_key(market)
+    content = analysis_cache.get(key)
+    if content is not None:
+        yield content
+        return
+
+    parts = []
+    async for delta in stream(analysis_messages(market)):
+        parts.append(delta)
+        yield delta
+    analysis_cache.set(key, "".join(parts))
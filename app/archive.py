@@ -0,0 +1,236 @@
+# app/archive.py
+"""
+Moves cold history out of the hot tables:
+
+    python -m app.archive                    # archive with the configured ages
+    python -m app.archive --partition        # Postgres: partition transactions by month first
+
+- Markets whose payout finished more than ARCHIVE_MARKETS_AFTER_DAYS ago:
+  their votes and comments move to archived_votes / archived_comments and
+  the Settlement is marked "archived". The market row stays in `markets`;
+  it's one row, and settlements, price history and the archived votes all
+  point at it.
+- Transactions older than ARCHIVE_TRANSACTIONS_AFTER_DAYS move to
+  archived_transactions.
+
+Rows keep their ids, so the profile and comment readers merge hot and
+archived rows in id order without knowing which is which. Everything is
+moved in chunks that commit on their own, and a run can be interrupted
+and repeated at any point.
+"""
+from sqlalchemy import delete, insert, select, text, update
+from datetime import datetime, timedelta
+import argparse
+import os
+
+from . import models, database
+
+ARCHIVE_MARKETS_AFTER_DAYS = int(os.getenv("ARCHIVE_MARKETS_AFTER_DAYS", "90"))
+ARCHIVE_TRANSACTIONS_AFTER_DAYS = int(os.getenv("ARCHIVE_TRANSACTIONS_AFTER_DAYS", "180"))
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "5000"))
+# Monthly transaction partitions created ahead of time, so inserts never land in the default one
+PARTITION_MONTHS_AHEAD = 3
+
+
+def _move(db, hot, cold, *where):
+    """Moves matching rows of `hot` into `cold` by id, one committed chunk at a time; returns the count."""
+    columns = [column.name for column in hot.__table__.columns]
+    moved = 0
+    while True:
+        ids = db.execute(select(hot.id).where(*where).order_by(hot.id).limit(ARCHIVE_CHUNK_SIZE)).scalars().all()
+        if not ids:
+            return moved
+        chunk = (hot.id >= ids[0], hot.id <= ids[-1], *where)
+        db.execute(insert(cold).from_select(columns, select(*hot.__table__.columns).where(*chunk)))
+        db.execute(delete(hot).where(*chunk).execution_options(synchronize_session=False))
+        db.commit()
+        moved += len(ids)
+
+
+def archive_markets(db, before):
+    """Archives the votes and comments of every market settled before `before`."""
+    jobs = db.execute(
+        select(models.Settlement).where(
+            models.Settlement.status == "done",
+            models.Settlement.finished_at < before
+        ).order_by(models.Settlement.id)
+    ).scalars().all()
+    votes = comments = 0
+    for job in jobs:
+        votes += _move(db, models.Vote, models.ArchivedVote, models.Vote.market_id == job.market_id)
+        comments += _move(db, models.Comment, models.ArchivedComment, models.Comment.market_id == job.market_id)
+        db.execute(update(models.Settlement).where(models.Settlement.id == job.id).values(status="archived"))
+        db.commit()
+    return {"markets": len(jobs), "votes": votes, "comments": comments}
+
+
+def archive_transactions(db, before):
+    """
+    Moves transactions older than `before`, walking up from the lowest id and
+    stopping at the first newer row, so it needs no index on timestamp.
+    """
+    moved = _drop_old_partitions(db, before) if is_partitioned(db) else 0
+    columns = [column.name for column in models.Transaction.__table__.columns]
+    while True:
+        rows = db.execute(
+            select(models.Transaction.id, models.Transaction.timestamp)
+            .order_by(models.Transaction.id).limit(ARCHIVE_CHUNK_SIZE)
+        ).all()
+        old = []
+        for row in rows:
+            if row.timestamp is None or row.timestamp >= before:
+                break
+            old.append(row.id)
+        if not old:
+            return moved
+        chunk = (models.Transaction.id >= old[0], models.Transaction.id <= old[-1])
+        db.execute(insert(models.ArchivedTransaction).from_select(
+            columns, select(*models.Transaction.__table__.columns).where(*chunk)
+        ))
+        db.execute(delete(models.Transaction).where(*chunk).execution_options(synchronize_session=False))
+        db.commit()
+        moved += len(old)
+        if len(old) < len(rows):
+            return moved
+
+
+def run(now=None):
+    """One archival pass with the configured ages; opens its own session like run_settlement."""
+    now = now or datetime.utcnow()
+    db = database.SessionLocal()
+    try:
+        if is_partitioned(db):
+            ensure_partitions(db, now)
+        done = archive_markets(db, now - timedelta(days=ARCHIVE_MARKETS_AFTER_DAYS))
+        done["transactions"] = archive_transactions(db, now - timedelta(days=ARCHIVE_TRANSACTIONS_AFTER_DAYS))
+        print(f"🗄️ Archived {done}")
+        return done
+    finally:
+        db.close()
+
+
+# --- POSTGRES PARTITIONING ---
+# transactions becomes PARTITION BY RANGE ("timestamp") with one partition per
+# month (transactions_pYYYYMM) and a default one. Archiving a whole month is
+# then a copy and a DROP TABLE instead of row-by-row deletes.
+
+def _month(at):
+    return datetime(at.year, at.month, 1)
+
+
+def _next_month(month):
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _partition_name(month):
+    return f"transactions_p{month:%Y%m}"
+
+
+def is_partitioned(db):
+    if db.bind.dialect.name != "postgresql":
+        return False
+    return db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('transactions')"
+    )).first() is not None
+
+
+def ensure_partitions(db, now, months_ahead=PARTITION_MONTHS_AHEAD):
+    """Creates monthly partitions up to `months_ahead` past now, pulling any matching rows out of the default partition."""
+    month = _month(now)
+    for _ in range(months_ahead + 1):
+        name = _partition_name(month)
+        if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+            bounds = {"start": month, "end": _next_month(month)}
+            db.execute(text(f"CREATE TABLE {name} (LIKE transactions INCLUDING DEFAULTS)"))
+            db.execute(text(
+                f'INSERT INTO {name} SELECT * FROM transactions_default WHERE "timestamp" >= :start AND "timestamp" < :end'
+            ), bounds)
+            db.execute(text('DELETE FROM transactions_default WHERE "timestamp" >= :start AND "timestamp" < :end'), bounds)
+            db.execute(text(
+                f"ALTER TABLE transactions ATTACH PARTITION {name} FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+            ))
+            db.commit()
+        month = _next_month(month)
+
+
+def _drop_old_partitions(db, before):
+    """Archives whole monthly partitions that end before `before`; returns rows moved."""
+    names = db.execute(text(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass('transactions') AND child.relname LIKE 'transactions_p%' "
+        "ORDER BY child.relname"
+    )).scalars().all()
+    moved = 0
+    for name in names:
+        month = datetime.strptime(name[len("transactions_p"):], "%Y%m")
+        if _next_month(month) > before:
+            break
+        moved += db.execute(text(
+            f"INSERT INTO archived_transactions (id, user_id, amount, description, \"timestamp\") "
+            f"SELECT id, user_id, amount, description, \"timestamp\" FROM {name}"
+        )).rowcount
+        db.execute(text(f"ALTER TABLE transactions DETACH PARTITION {name}"))
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+    return moved
+
+
+def partition_transactions(engine=None, now=None):
+    """
+    One-off conversion of a plain Postgres transactions table into a
+    partitioned one. Takes an exclusive lock while the rows are copied,
+    so run it in a maintenance window.
+    """
+    engine = engine or database.engine
+    now = now or datetime.utcnow()
+    if engine.dialect.name != "postgresql":
+        print("Partitioning is only available on Postgres.")
+        return
+    db = database.SessionLocal(bind=engine)
+    try:
+        if is_partitioned(db):
+            print("transactions is already partitioned.")
+            ensure_partitions(db, now)
+            return
+        first = db.execute(text('SELECT min("timestamp") FROM transactions')).scalar() or now
+
+        for statement in (
+            "LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE",
+            "ALTER TABLE transactions RENAME TO transactions_unpartitioned",
+            "ALTER INDEX IF EXISTS ix_transactions_id RENAME TO ix_transactions_unpartitioned_id",
+            "ALTER INDEX IF EXISTS ix_transactions_user_id_id RENAME TO ix_transactions_unpartitioned_user_id_id",
+            'CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")',
+            # The partition key has to be part of the primary key
+            'ALTER TABLE transactions ALTER COLUMN "timestamp" SET NOT NULL',
+            'ALTER TABLE transactions ADD PRIMARY KEY (id, "timestamp")',
+            "ALTER TABLE transactions ADD FOREIGN KEY (user_id) REFERENCES users (id)",
+            "CREATE INDEX ix_transactions_user_id_id ON transactions (user_id, id)",
+            "CREATE TABLE transactions_default PARTITION OF transactions DEFAULT",
+            'INSERT INTO transactions (id, user_id, amount, description, "timestamp") '
+            'SELECT id, user_id, amount, description, coalesce("timestamp", now()) FROM transactions_unpartitioned',
+            # Keep the id sequence when the old table goes
+            "ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id",
+            "DROP TABLE transactions_unpartitioned",
+        ):
+            db.execute(text(statement))
+        db.commit()
+
+        # Split the copied rows out of the default partition month by month
+        months = 0
+        month = _month(first)
+        while month <= _month(now):
+            months += 1
+            month = _next_month(month)
+        ensure_partitions(db, first, months_ahead=months + PARTITION_MONTHS_AHEAD)
+        print(f"Partitioned transactions by month from {_month(first):%Y-%m}.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old markets' votes/comments and old transactions to the archive tables.")
+    parser.add_argument("--partition", action="store_true", help="Postgres: convert transactions to monthly partitions first")
+    args = parser.parse_args()
+    if args.partition:
+        partition_transactions()
+    run()
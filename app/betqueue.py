@@ -0,0 +1,78 @@
+# app/betqueue.py
+
+import asyncio
+import os
+
+from . import database, betting
+
+# --- CONFIGURATION ---
+# Off by default: bets commit one per request through betting.place_bet
+BET_GROUP_COMMIT = os.getenv("BET_GROUP_COMMIT", "0") == "1"
+# How long the first bet of a burst waits for company before its batch runs
+BET_BATCH_WINDOW = float(os.getenv("BET_BATCH_WINDOW", "0.005"))
+BET_BATCH_MAX = int(os.getenv("BET_BATCH_MAX", "200"))
+
+
+class BetQueue:
+    """
+    Per-market micro-batching of bets. submit() parks the bet on its market's
+    queue; one worker per busy market drains it through betting.place_bets,
+    so a hot market pays for one pool UPDATE and one commit per batch instead
+    of per bet. Bets that arrive while a batch is committing form the next one.
+    Must be used from the event loop; batches only form within this process.
+    """
+
+    def __init__(self, window=BET_BATCH_WINDOW, max_batch=BET_BATCH_MAX):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {} # market_id -> [((user_id, choice, wager), future)]
+        self._workers = {} # market_id -> drain task
+        self.batches = 0
+        self.bets = 0
+
+    async def submit(self, user_id, market_id, choice, wager):
+        """Same contract as place_bet: (yes_pool, no_pool) or raises BetRejected."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(market_id, []).append(((user_id, choice, wager), future))
+        if market_id not in self._workers:
+            self._workers[market_id] = asyncio.create_task(self._drain(market_id))
+        # A caller that goes away doesn't cancel its bet, same as the per-request path
+        return await asyncio.shield(future)
+
+    async def _drain(self, market_id):
+        try:
+            await asyncio.sleep(self.window)
+            while self._pending.get(market_id):
+                queue = self._pending[market_id]
+                batch, self._pending[market_id] = queue[:self.max_batch], queue[self.max_batch:]
+                await self._run(market_id, batch)
+        finally:
+            del self._workers[market_id]
+            if not self._pending.get(market_id):
+                self._pending.pop(market_id, None)
+
+    async def _run(self, market_id, batch):
+        self.batches += 1
+        self.bets += len(batch)
+        try:
+            async with database.AsyncSessionLocal() as db:
+                results = await db.run_sync(betting.place_bets, market_id, [bet for bet, _ in batch])
+        except Exception as e:
+            # e.g. the DB went away mid-batch; every caller in it sees the error
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "bets": self.bets,
+            "avg_batch": round(self.bets / self.batches, 1) if self.batches else 0,
+            "queued": sum(len(queue) for queue in self._pending.values())
+        }
+
+
+bet_queue = BetQueue()
@@ -0,0 +1,212 @@
+# app/betting.py
+
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+
+from . import models, identity, history
+from .leaderboard import board
+
+
+class BetRejected(Exception):
+    """Raised when a bet fails validation or loses a guarded update."""
+
+
+def _guarded_update(db, stmt, model, row_id, *columns):
+    """
+    Runs a conditional UPDATE and returns the requested columns of the
+    updated row, or None when the WHERE guard matched nothing.
+    Uses RETURNING where the backend has it (Postgres, SQLite >= 3.35),
+    otherwise falls back to rowcount plus a re-read inside the same
+    transaction, which already holds the row/database write lock.
+    """
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(*columns)).first()
+    if db.execute(stmt).rowcount == 0:
+        return None
+    return db.execute(select(*columns).where(model.id == row_id)).first()
+
+
+def _validate(choice, wager):
+    if choice not in ("yes", "no"):
+        raise BetRejected("Invalid choice.")
+    if wager <= 0:
+        raise BetRejected("Wager must be positive.")
+
+
+def place_bet(db, user_id, market_id, choice, wager):
+    """
+    Debits the wallet, bumps the pool and records the Vote and Transaction
+    in a single transaction. Every check that matters under concurrency is
+    part of an UPDATE's WHERE clause, so two racing bets can never overdraw
+    a wallet or land on a market that was resolved in the meantime.
+    Returns the market's (yes_pool, no_pool) after the bet.
+    """
+    _validate(choice, wager)
+
+    question = db.execute(
+        select(models.Market.question).where(models.Market.id == market_id)
+    ).scalar()
+    if question is None:
+        raise BetRejected("Market not found.")
+
+    already_voted = db.execute(
+        select(models.Vote.id).where(
+            models.Vote.user_id == user_id,
+            models.Vote.market_id == market_id
+        )
+    ).first()
+    if already_voted:
+        raise BetRejected("You have already bet on this market.")
+
+    # Lock order is always users -> markets so concurrent bets can't deadlock.
+    debit = update(models.User).where(
+        models.User.id == user_id,
+        models.User.balance >= wager
+    ).values(balance=models.User.balance - wager).execution_options(synchronize_session=False)
+    debited = _guarded_update(db, debit, models.User, user_id, models.User.balance)
+    if debited is None:
+        db.rollback()
+        raise BetRejected("Insufficient funds!")
+
+    pool = models.Market.yes_pool if choice == "yes" else models.Market.no_pool
+    credit = update(models.Market).where(
+        models.Market.id == market_id,
+        models.Market.is_open == True
+    ).values({pool: pool + wager}).execution_options(synchronize_session=False)
+    pools = _guarded_update(
+        db, credit, models.Market, market_id,
+        models.Market.yes_pool, models.Market.no_pool
+    )
+    if pools is None:
+        db.rollback()
+        raise BetRejected("This market is closed.")
+
+    # Still under the market row lock taken by the pool UPDATE above. Runs before
+    # the Vote is added so a duplicate vote only surfaces at commit, below.
+    history.record(db, market_id, pools.yes_pool, pools.no_pool)
+
+    db.add(models.Vote(user_id=user_id, market_id=market_id, choice=choice, wager=wager))
+    db.add(models.Transaction(
+        user_id=user_id,
+        amount=-wager,
+        description=f"Bet on {question} ({choice.upper()})"
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost the race on the (user_id, market_id) unique constraint.
+        db.rollback()
+        raise BetRejected("You have already bet on this market.")
+
+    board.set_balance(user_id, debited.balance)
+    identity.forget(user_id)
+    return pools.yes_pool, pools.no_pool
+
+
+def place_bets(db, market_id, bets):
+    """
+    Group-commit variant of place_bet for a burst of bets on one market:
+    a guarded debit per wallet, then one pool UPDATE, bulk Vote and
+    Transaction inserts, one price point and one commit for the whole batch.
+
+    bets is a list of (user_id, choice, wager). Returns a list in the same
+    order holding the market's (yes_pool, no_pool) after the batch for each
+    accepted bet, or the BetRejected explaining why that bet was refused.
+    """
+    results = [None] * len(bets)
+    question = db.execute(
+        select(models.Market.question).where(models.Market.id == market_id)
+    ).scalar()
+    if question is None:
+        return [BetRejected("Market not found.")] * len(bets)
+
+    # Per-bet checks; a user betting twice in one batch keeps only the first
+    candidates = {}
+    for i, (user_id, choice, wager) in enumerate(bets):
+        try:
+            _validate(choice, wager)
+            if user_id in candidates:
+                raise BetRejected("You have already bet on this market.")
+        except BetRejected as e:
+            results[i] = e
+            continue
+        candidates[user_id] = i
+    if not candidates:
+        return results
+
+    voted = db.execute(
+        select(models.Vote.user_id).where(
+            models.Vote.market_id == market_id,
+            models.Vote.user_id.in_(list(candidates))
+        )
+    ).scalars().all()
+    for user_id in voted:
+        results[candidates.pop(user_id)] = BetRejected("You have already bet on this market.")
+
+    # Wallets are locked in id order, then the market last, the same
+    # users -> markets order place_bet uses, so batches can't deadlock.
+    placed = {}
+    for user_id in sorted(candidates):
+        i = candidates[user_id]
+        wager = bets[i][2]
+        debit = update(models.User).where(
+            models.User.id == user_id,
+            models.User.balance >= wager
+        ).values(balance=models.User.balance - wager).execution_options(synchronize_session=False)
+        debited = _guarded_update(db, debit, models.User, user_id, models.User.balance)
+        if debited is None:
+            results[i] = BetRejected("Insufficient funds!")
+        else:
+            placed[i] = debited.balance
+    if not placed:
+        db.rollback()
+        return results
+
+    yes_total = sum(bets[i][2] for i in placed if bets[i][1] == "yes")
+    no_total = sum(bets[i][2] for i in placed if bets[i][1] == "no")
+    credit = update(models.Market).where(
+        models.Market.id == market_id,
+        models.Market.is_open == True
+    ).values(
+        yes_pool=models.Market.yes_pool + yes_total,
+        no_pool=models.Market.no_pool + no_total
+    ).execution_options(synchronize_session=False)
+    pools = _guarded_update(
+        db, credit, models.Market, market_id,
+        models.Market.yes_pool, models.Market.no_pool
+    )
+    if pools is None:
+        db.rollback()
+        for i in placed:
+            results[i] = BetRejected("This market is closed.")
+        return results
+
+    # One chart point per batch: the pools after its last bet
+    history.record(db, market_id, pools.yes_pool, pools.no_pool, bets=len(placed))
+    try:
+        db.execute(insert(models.Vote), [
+            {"user_id": bets[i][0], "market_id": market_id, "choice": bets[i][1], "wager": bets[i][2]}
+            for i in placed
+        ])
+        db.execute(insert(models.Transaction), [
+            {"user_id": bets[i][0], "amount": -bets[i][2], "description": f"Bet on {question} ({bets[i][1].upper()})"}
+            for i in placed
+        ])
+        db.commit()
+    except IntegrityError:
+        # Someone outside this batch won a (user_id, market_id) race. Redo the
+        # batch one bet at a time so only that bet is refused.
+        db.rollback()
+        for i in placed:
+            user_id, choice, wager = bets[i]
+            try:
+                results[i] = place_bet(db, user_id, market_id, choice, wager)
+            except BetRejected as e:
+                results[i] = e
+        return results
+
+    for i, balance in placed.items():
+        board.set_balance(bets[i][0], balance)
+        identity.forget(bets[i][0])
+        results[i] = (pools.yes_pool, pools.no_pool)
+    return results
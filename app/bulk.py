@@ -0,0 +1,316 @@
+# app/bulk.py
+"""
+Admin operations that touch many rows at once:
+
+    python -m app.bulk import markets.csv        # or .ndjson / .jsonl
+    python -m app.bulk delete-user 42            # start or resume a user deletion
+
+Market import parses a CSV (header: question, description, category) or
+NDJSON file, rejects the whole file if any row is invalid, and inserts
+everything in one transaction with batched multi-row INSERTs.
+
+User deletion is a chunked background job, like settlement.py: the user's
+votes go a chunk at a time, each chunk first taking its wagers back out of
+the pools of markets that are still open, then their transactions,
+comments and archived rows, then the user. A UserDeletion row records
+progress, so a crashed run resumes where it stopped, and jobs.py keeps a
+second runner from taking the same chunk out of the pools twice.
+"""
+from sqlalchemy import delete, func, insert, select, update
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+
+from . import models, database, identity, history, quotes, jobs
+from .leaderboard import board
+
+IMPORT_MAX_MARKETS = int(os.getenv("IMPORT_MAX_MARKETS", "50000"))
+# Rows per multi-row INSERT statement
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Invalid rows listed back to the caller; the rest are only counted
+IMPORT_MAX_ERRORS = 20
+# Votes per committed chunk; each touched open market also gets a price point
+DELETION_CHUNK_SIZE = int(os.getenv("DELETION_CHUNK_SIZE", "1000"))
+
+
+class ImportRejected(Exception):
+    """Raised when an import file can't be used; `errors` lists the bad lines."""
+
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+
+# --- MARKET IMPORT ---
+def detect_format(filename=None, content_type=None):
+    """"ndjson" for .ndjson/.jsonl files or JSON content types, otherwise "csv"."""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl", ".json")) or "json" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def _records(text, fmt):
+    """(line number, dict) for each record in the file."""
+    if fmt == "ndjson":
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield number, record
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or "question" not in [name.strip().lower() for name in reader.fieldnames]:
+            raise ImportRejected("CSV needs a header row with at least a question column.")
+        for record in reader:
+            yield reader.line_num, {(key or "").strip().lower(): value for key, value in record.items()}
+
+
+def parse_markets(data, fmt="csv", max_markets=IMPORT_MAX_MARKETS):
+    """
+    Validates an import file and returns the market rows to insert.
+    Raises ImportRejected if the file is too large or any row is invalid,
+    so a bad file never half-imports.
+    """
+    try:
+        text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    except UnicodeDecodeError:
+        raise ImportRejected("File must be UTF-8.")
+
+    rows, errors, invalid = [], [], 0
+    for number, record in _records(text, fmt):
+        if len(rows) + invalid >= max_markets:
+            raise ImportRejected(f"At most {max_markets} markets per import.")
+        if not isinstance(record, dict):
+            error = "Not a JSON object."
+        else:
+            question = str(record.get("question") or "").strip()
+            description = str(record.get("description") or "").strip()
+            category = str(record.get("category") or "").strip() or "General"
+            if not question:
+                error = "Missing question."
+            elif category not in models.MARKET_CATEGORIES:
+                error = f"Unknown category {category!r}."
+            else:
+                rows.append({
+                    "question": question, "description": description, "category": category,
+                    "yes_pool": 0, "no_pool": 0, "is_open": True
+                })
+                continue
+        invalid += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"line": number, "error": error})
+
+    if invalid:
+        raise ImportRejected(f"{invalid} invalid rows; nothing was imported.", errors)
+    if not rows:
+        raise ImportRejected("No markets in the file.")
+    return rows
+
+
+def import_markets(db, rows):
+    """
+    Inserts parsed market rows in one transaction, IMPORT_CHUNK_SIZE rows
+    per INSERT; returns the new ids in file order. The search triggers
+    index each market as it lands.
+    """
+    stmt = insert(models.Market).returning(models.Market.id, sort_by_parameter_order=True)
+    ids = []
+    for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+        ids += db.execute(stmt, rows[start:start + IMPORT_CHUNK_SIZE]).scalars().all()
+    db.commit()
+    for market_id in ids:
+        quotes.snapshot.set(market_id, 0, 0)
+    print(f"📥 Imported {len(ids)} markets")
+    return ids
+
+
+# --- USER DELETION ---
+def start_deletion(db, user_id):
+    """
+    Records a pending UserDeletion job and returns it (the existing job if
+    one was already started), or None if the user doesn't exist.
+    The wallet is zeroed in the same transaction, so the guarded debit in
+    betting.py refuses any bet the user tries while the job runs.
+    """
+    job = db.execute(
+        select(models.UserDeletion).where(models.UserDeletion.user_id == user_id)
+    ).scalar_one_or_none()
+    if job is not None:
+        return job
+
+    username = db.execute(select(models.User.username).where(models.User.id == user_id)).scalar()
+    if username is None:
+        return None
+    db.execute(
+        update(models.User).where(models.User.id == user_id).values(balance=0)
+        .execution_options(synchronize_session=False)
+    )
+    job = models.UserDeletion(
+        user_id=user_id,
+        username=username,
+        votes=db.execute(select(func.count(models.Vote.id)).where(models.Vote.user_id == user_id)).scalar()
+    )
+    db.add(job)
+    db.commit()
+    board.remove(user_id)
+    identity.forget(user_id)
+    return job
+
+
+def _remove_vote_chunk(db, user_id, last_vote_id, vote_ids):
+    """
+    Takes one chunk of the user's wagers out of the pools of open markets
+    with a single UPDATE, then deletes the votes. Closed markets keep their
+    pools: settlement already snapshotted them. Does not commit.
+    Returns the new (market_id, yes_pool, no_pool) of the adjusted markets
+    and the coins taken out of them.
+    """
+    Vote, Market = models.Vote, models.Market
+    chunk = (Vote.user_id == user_id, Vote.id > last_vote_id, Vote.id <= vote_ids[-1])
+
+    def side_total(choice):
+        # One vote per (user, market), so this is that vote's wager or 0
+        return select(func.coalesce(func.sum(Vote.wager), 0)).where(
+            Vote.market_id == Market.id, Vote.choice == choice, *chunk
+        ).scalar_subquery()
+
+    open_markets = (Market.id.in_(select(Vote.market_id).where(*chunk)), Market.is_open == True)
+    db.execute(
+        update(Market).where(*open_markets).values(
+            yes_pool=Market.yes_pool - side_total("yes"),
+            no_pool=Market.no_pool - side_total("no")
+        ).execution_options(synchronize_session=False)
+    )
+    # The UPDATE holds those markets' row locks, so they're still open here
+    removed = db.execute(
+        select(func.coalesce(func.sum(Vote.wager), 0)).join(Market, Market.id == Vote.market_id)
+        .where(*chunk, Market.is_open == True)
+    ).scalar()
+    pools = db.execute(select(Market.id, Market.yes_pool, Market.no_pool).where(*open_markets)).all()
+    for market_id, yes_pool, no_pool in pools:
+        history.record(db, market_id, yes_pool, no_pool, bets=0)
+
+    db.execute(delete(Vote).where(*chunk).execution_options(synchronize_session=False))
+    return pools, removed
+
+
+def _delete_owned(db, deletion_id, user_id, model):
+    """Deletes the user's rows of `model` one committed chunk at a time."""
+    while True:
+        ids = db.execute(
+            select(model.id).where(model.user_id == user_id).order_by(model.id).limit(DELETION_CHUNK_SIZE)
+        ).scalars().all()
+        if not ids:
+            return
+        deleted = db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+        # rowcount, not len(ids): a runner taking over may have deleted some already
+        jobs.bump(db, models.UserDeletion, deletion_id, rows_deleted=deleted.rowcount)
+        db.commit()
+
+
+def run_deletion(deletion_id):
+    """
+    Runs a UserDeletion job to completion. Safe to call again after a
+    crash: each vote chunk's pool UPDATE, price points, DELETE and
+    last_vote_id bump commit together. Returns without touching anything
+    if another runner holds the job (jobs.py).
+    """
+    db = database.SessionLocal()
+    try:
+        if not jobs.claim(db, models.UserDeletion, deletion_id):
+            print(f"⏳ User deletion {deletion_id} is finished or already running")
+            return
+        job = db.get(models.UserDeletion, deletion_id)
+        user_id, last_vote_id = job.user_id, job.last_vote_id
+
+        while True:
+            vote_ids = db.execute(
+                select(models.Vote.id).where(
+                    models.Vote.user_id == user_id,
+                    models.Vote.id > last_vote_id
+                ).order_by(models.Vote.id).limit(DELETION_CHUNK_SIZE)
+            ).scalars().all()
+            if not vote_ids:
+                break
+            if not jobs.advance(db, models.UserDeletion, deletion_id, last_vote_id, vote_ids[-1],
+                                processed=len(vote_ids)):
+                db.rollback()
+                print(f"⏳ User deletion {deletion_id} was taken over by another runner")
+                return
+            pools, removed = _remove_vote_chunk(db, user_id, last_vote_id, vote_ids)
+            jobs.bump(db, models.UserDeletion, deletion_id, pool_removed=removed)
+            db.commit()
+            last_vote_id = vote_ids[-1]
+            for market_id, yes_pool, no_pool in pools:
+                quotes.snapshot.set(market_id, yes_pool, no_pool)
+
+        for model in (models.Transaction, models.Comment, models.ArchivedVote,
+                      models.ArchivedTransaction, models.ArchivedComment):
+            _delete_owned(db, deletion_id, user_id, model)
+
+        db.execute(delete(models.User).where(models.User.id == user_id).execution_options(synchronize_session=False))
+        if not jobs.finish(db, models.UserDeletion, deletion_id, "done"):
+            return
+        board.remove(user_id)
+        identity.forget(user_id)
+        db.refresh(job)
+        print(f"🗑️ Deleted user {job.username}: {job.processed} bets, {job.pool_removed} coins out of open pools")
+    except Exception as e:
+        print(f"User deletion {deletion_id} failed: {e}")
+        db.rollback()
+        jobs.finish(db, models.UserDeletion, deletion_id, "failed")
+    finally:
+        db.close()
+
+
+def deletion_progress(job):
+    return {
+        "user_id": job.user_id,
+        "username": job.username,
+        "status": job.status,
+        "votes": job.votes,
+        "processed": job.processed,
+        "pool_removed": job.pool_removed,
+        "rows_deleted": job.rows_deleted,
+        "percent": 100 if job.status == "done" or not job.votes else min(99, round(job.processed * 100 / job.votes))
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk admin operations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="import markets from a CSV or NDJSON file")
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=("csv", "ndjson"), help="default: from the file extension")
+    deleter = commands.add_parser("delete-user", help="delete a user, or resume a stuck or failed deletion")
+    deleter.add_argument("user_id", type=int)
+    args = parser.parse_args()
+
+    db = database.SessionLocal()
+    try:
+        if args.command == "import":
+            with open(args.path, "rb") as f:
+                data = f.read()
+            try:
+                rows = parse_markets(data, args.format or detect_format(args.path), max_markets=sys.maxsize)
+            except ImportRejected as e:
+                for error in e.errors:
+                    print(f"line {error['line']}: {error['error']}")
+                sys.exit(str(e))
+            import_markets(db, rows)
+        else:
+            job = start_deletion(db, args.user_id)
+            if job is None:
+                sys.exit("No such user.")
+            run_deletion(job.id)
+            db.refresh(job)
+            print(deletion_progress(job))
+    finally:
+        db.close()
@@ -0,0 +1,74 @@
+# app/cache.py
+
+from collections import OrderedDict
+import asyncio
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Small in-process cache with a per-entry TTL and LRU eviction.
+    Each worker process has its own copy, so TTLs should be short enough
+    that a stale entry on another instance is acceptable.
+    """
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        # Background tasks invalidate from the threadpool, not just the event loop
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """
+    Runs at most one task per key at a time on the event loop; callers that
+    arrive while it's running get the same task instead of starting another.
+    Await the result through asyncio.shield() so one caller disconnecting
+    doesn't cancel the work for everyone else.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    def run(self, key, factory):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._tasks.pop(key, None))
+        return task
+
+    def __contains__(self, key):
+        return key in self._tasks
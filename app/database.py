@@ -1,7 +1,11 @@
 # app/database.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import itertools
 import os
+import uuid
 
 # Get DB URL
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
@@ -14,18 +18,168 @@ else:
     print("✅ SUCCESS: Found DATABASE_URL environment variable.")
 
 # Fix for Neon/Postgres URL format
-if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def normalize_url(url):
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
 
-# Args for SQLite only
-connect_args = {}
-if "sqlite" in SQLALCHEMY_DATABASE_URL:
-    connect_args = {"check_same_thread": False}
+SQLALCHEMY_DATABASE_URL = normalize_url(SQLALCHEMY_DATABASE_URL)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
-)
+# --- Engine profiles ---
+# DB_PROFILE picks how engines are tuned:
+#   auto      - "sqlite" for SQLite URLs, "postgres" otherwise (default)
+#   sqlite    - WAL, synchronous=NORMAL, busy_timeout and mmap on every connection
+#   postgres  - app-side pool sized by DB_POOL_*, pre-ping, recycle before idle cutoffs
+#   pgbouncer - no app-side pool and no prepared statements, for transaction-mode poolers
+#   plain     - SQLAlchemy defaults (the old behaviour)
+DB_PROFILE = os.getenv("DB_PROFILE", "auto")
+if DB_PROFILE == "auto":
+    DB_PROFILE = "sqlite" if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else "postgres"
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL") # safe with WAL; loses at most the last commits on power loss
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "15000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Neon and most managed Postgres drop idle connections after ~5 minutes
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+
+print(f"🔧 DB profile: {DB_PROFILE}")
+
+def engine_options(url, is_async=False):
+    """create_engine / create_async_engine keyword arguments for DB_PROFILE."""
+    options = {"connect_args": {}}
+    if url.startswith("sqlite"):
+        if not is_async:
+            options["connect_args"]["check_same_thread"] = False
+        if DB_PROFILE == "sqlite":
+            # The driver's own lock wait, in seconds; PRAGMA busy_timeout below mirrors it
+            options["connect_args"]["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000
+        return options
+
+    if DB_PROFILE == "postgres":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+    elif DB_PROFILE == "pgbouncer":
+        # PgBouncer owns the pooling; in transaction mode a server connection can
+        # change between statements, so named prepared statements must be off
+        options["poolclass"] = NullPool
+        if is_async and "+asyncpg" in url:
+            options["connect_args"].update(
+                statement_cache_size=0,
+                prepared_statement_cache_size=0,
+                prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__"
+            )
+    return options
+
+def tune_sqlite(sync_engine):
+    """Applies the SQLite pragmas to every new DBAPI connection of the engine."""
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Async engine for request handlers ---
+# Derived from DATABASE_URL: asyncpg on Postgres, aiosqlite on SQLite.
+# Set ASYNC_DATABASE_URL to pick another driver (e.g. postgresql+psycopg://).
+# The sync engine above stays for background jobs and scripts.
+def to_async_url(url):
+    if url.startswith("postgresql://"):
+        # asyncpg spells libpq's sslmode as ssl
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1).replace("sslmode=", "ssl=")
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+
+if DB_PROFILE == "sqlite" and SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    tune_sqlite(engine)
+    tune_sqlite(async_engine.sync_engine)
+
+# --- Write tracking ---
+# Request sessions record in info["committed_write"] whether a commit actually
+# changed rows, so main.get_db only pins writers to the primary (read-your-writes)
+class WriteTrackingSession(Session):
+    pass
+
+@event.listens_for(WriteTrackingSession, "after_flush")
+def _flushed(session, flush_context):
+    session.info["pending_write"] = True
+
+@event.listens_for(WriteTrackingSession, "do_orm_execute")
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["pending_write"] = True
+
+@event.listens_for(WriteTrackingSession, "after_commit")
+def _committed(session):
+    if session.info.pop("pending_write", False):
+        session.info["committed_write"] = True
+
+@event.listens_for(WriteTrackingSession, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("pending_write", None)
+
+# expire_on_commit=False: templates read attributes after commit, and an
+# expired attribute would need lazy IO, which AsyncSession can't do implicitly
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False, sync_session_class=WriteTrackingSession
+)
+
+# --- Read replicas ---
+# DATABASE_REPLICA_URLS: comma-separated read-only copies of the primary
+# (streaming replicas on Postgres, a second file locally on SQLite).
+# ReplicaSessionLocal() hands out sessions on them round-robin, or on the
+# primary when none are configured. Replicas lag, so main.get_read_db sends
+# a visitor back to the primary for a short while after they write.
+DATABASE_REPLICA_URLS = [normalize_url(url.strip()) for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+def query_only(sync_engine):
+    """Makes SQLite reject writes on the engine's connections, so a misrouted write fails loudly."""
+    @event.listens_for(sync_engine, "connect")
+    def _set_query_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+replica_engines = []
+for replica_url in DATABASE_REPLICA_URLS:
+    replica_url = to_async_url(replica_url)
+    replica_engine = create_async_engine(replica_url, **engine_options(replica_url, is_async=True))
+    if replica_url.startswith("sqlite"):
+        if DB_PROFILE == "sqlite":
+            tune_sqlite(replica_engine.sync_engine)
+        query_only(replica_engine.sync_engine)
+    replica_engines.append(replica_engine)
+
+if replica_engines:
+    print(f"🔧 Read replicas: {len(replica_engines)}")
+
+_replica_sessions = [
+    async_sessionmaker(replica_engine, autoflush=False, expire_on_commit=False) for replica_engine in replica_engines
+] or [AsyncSessionLocal]
+_next_replica = itertools.count()
+
+def ReplicaSessionLocal():
+    return _replica_sessions[next(_next_replica) % len(_replica_sessions)]()
+
 Base = declarative_base()
@@ -0,0 +1,105 @@
+# app/exports.py
+"""
+Streaming history exports (CSV or NDJSON, optionally gzipped).
+
+Rows are read with AsyncSession.stream(), a server-side cursor, and sent
+as each batch of EXPORT_BATCH_SIZE arrives, so memory stays flat however
+many rows there are. Every export is in id order and takes an id range:
+`after` (exclusive) and `until` (inclusive). A client whose download
+broke resumes from the last id it received.
+
+Archived rows (archive.py) are included. Votes are archived market by
+market, so archived and hot ids interleave: both tables are read in one
+UNION ALL ... ORDER BY id, which SQLite and Postgres run as a merge of the
+two id-ordered scans rather than a sort of the whole result.
+"""
+from sqlalchemy import literal_column, select, union_all, DateTime
+import csv
+import io
+import json
+import os
+import zlib
+
+from . import models, database
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# kind -> (columns, (archive model, hot model))
+EXPORTS = {
+    "transactions": (("id", "user_id", "amount", "description", "timestamp"),
+                     (models.ArchivedTransaction, models.Transaction)),
+    "votes": (("id", "user_id", "market_id", "choice", "wager"),
+              (models.ArchivedVote, models.Vote)),
+}
+
+
+def _date_columns(kind):
+    """Positions of the DateTime columns, the only values that need converting before encoding."""
+    columns, sources = EXPORTS[kind]
+    return [i for i, name in enumerate(columns) if isinstance(getattr(sources[-1], name).type, DateTime)]
+
+
+def _query(kind, after=None, until=None, **filters):
+    """Every source table's rows in the range and filters (e.g. user_id=3), as one id-ordered SELECT."""
+    columns, sources = EXPORTS[kind]
+    queries = []
+    for model in sources:
+        query = select(*(getattr(model, name) for name in columns))
+        for name, value in filters.items():
+            query = query.where(getattr(model, name) == value)
+        if after is not None:
+            query = query.where(model.id > after)
+        if until is not None:
+            query = query.where(model.id <= until)
+        queries.append(query)
+    return union_all(*queries).order_by(literal_column("id"))
+
+
+async def stream_rows(kind, after=None, until=None, session_factory=None, **filters):
+    """
+    Yields lists of row tuples, one server-side cursor batch at a time. Opens
+    its own session: the request's is closed before a streamed body is sent.
+    """
+    session_factory = session_factory or database.ReplicaSessionLocal
+    async with session_factory() as db:
+        result = await db.stream(_query(kind, after, until, **filters).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for batch in result.partitions():
+            yield batch
+
+
+def encode(columns, batch, fmt, header=False, dates=()):
+    """One batch of rows as CSV or NDJSON text; `dates` are the positions to write as ISO 8601."""
+    if dates:
+        batch = [list(row) for row in batch]
+        for row in batch:
+            for i in dates:
+                if row[i] is not None:
+                    row[i] = row[i].isoformat()
+    if fmt == "ndjson":
+        return "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in batch)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows(batch)
+    return out.getvalue()
+
+
+async def export(kind, fmt="csv", gzip=False, after=None, until=None, session_factory=None, **filters):
+    """The response body: encoded batches, gzip-compressed on the fly when asked."""
+    columns, dates = EXPORTS[kind][0], _date_columns(kind)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None # 31: gzip container
+
+    def output(text):
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    if fmt == "csv":
+        yield output(encode(columns, [], fmt, header=True))
+    async for batch in stream_rows(kind, after, until, session_factory, **filters):
+        chunk = output(encode(columns, batch, fmt, dates=dates))
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,183 @@
+# app/history.py
+
+from sqlalchemy import select, update, case
+from datetime import datetime, timedelta
+import os
+
+from . import models
+
+# --- CONFIGURATION ---
+# Bucket sizes (seconds) kept in price_rollups; finest first
+ROLLUP_LEVELS = (60, 600, 3600, 86400)
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", "1000"))
+# A chart reads at most this many rows per point it returns, then downsamples
+HISTORY_ROWS_PER_POINT = 8
+
+
+def yes_probability(yes_pool, no_pool):
+    total = yes_pool + no_pool
+    return 50.0 if total == 0 else round(yes_pool / total * 100, 2)
+
+EPOCH = datetime(1970, 1, 1)
+
+def to_epoch(at):
+    """Naive UTC datetime (what the models store) -> whole unix seconds."""
+    return int((at - EPOCH).total_seconds())
+
+def from_epoch(seconds):
+    return EPOCH + timedelta(seconds=seconds)
+
+
+# --- WRITING ---
+def record(db, market_id, yes_pool, no_pool, at=None, bets=1):
+    """
+    Appends a price point and folds it into every rollup level. `bets` is
+    how many bets the point stands for: a batch's size, or 0 when the pools
+    moved for another reason (a user deletion). Call inside the transaction
+    that changed the pools, after the market UPDATE: that UPDATE holds the
+    market's row lock until commit, so the update-then-insert below can't
+    race another bet on the same market.
+    Does not commit.
+    """
+    at = at or datetime.utcnow()
+    pct = yes_probability(yes_pool, no_pool)
+    db.add(models.PricePoint(market_id=market_id, timestamp=at, yes_pool=yes_pool, no_pool=no_pool))
+
+    epoch = to_epoch(at)
+    Rollup = models.PriceRollup
+    for seconds in ROLLUP_LEVELS:
+        bucket_start = from_epoch(epoch - epoch % seconds)
+        stmt = update(Rollup).where(
+            Rollup.market_id == market_id,
+            Rollup.resolution == seconds,
+            Rollup.bucket_start == bucket_start
+        ).values(
+            yes_pool=yes_pool,
+            no_pool=no_pool,
+            low_pct=case((Rollup.low_pct > pct, pct), else_=Rollup.low_pct),
+            high_pct=case((Rollup.high_pct < pct, pct), else_=Rollup.high_pct),
+            bets=Rollup.bets + bets
+        ).execution_options(synchronize_session=False)
+        if db.execute(stmt).rowcount == 0:
+            db.add(Rollup(
+                market_id=market_id, resolution=seconds, bucket_start=bucket_start,
+                yes_pool=yes_pool, no_pool=no_pool, low_pct=pct, high_pct=pct, bets=bets
+            ))
+
+
+# --- READING ---
+def lttb(points, threshold, key=lambda p: (p[0], p[1])):
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps the first and last
+    point and, from each bucket in between, the point that forms the largest
+    triangle with its neighbours, so spikes survive the reduction.
+    """
+    if threshold >= len(points):
+        return points
+    if threshold < 3:
+        return [points[0], points[-1]]
+
+    xs, ys = zip(*map(key, points))
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = None, -1
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+async def series(db, market_id, start, end, points=200):
+    """
+    Probability series for [start, end] with at most `points` entries.
+    Short ranges read raw points (falling back if there are too many),
+    longer ones the finest rollup level that fits; either way the rows read are bounded by
+    points * HISTORY_ROWS_PER_POINT, not by how many bets the market has.
+    """
+    points = max(2, min(points, HISTORY_MAX_POINTS))
+    row_limit = points * HISTORY_ROWS_PER_POINT
+    span = max(to_epoch(end) - to_epoch(start), 1)
+
+    # Raw points only pay off when even the finest rollup can't fill the chart
+    if span / ROLLUP_LEVELS[0] < points:
+        Point = models.PricePoint
+        rows = (await db.execute(
+            select(Point.timestamp, Point.yes_pool, Point.no_pool).where(
+                Point.market_id == market_id,
+                Point.timestamp >= start,
+                Point.timestamp <= end
+            ).order_by(Point.timestamp, Point.id).limit(row_limit + 1)
+        )).all()
+        if len(rows) <= row_limit:
+            raw = [(to_epoch(row.timestamp), yes_probability(row.yes_pool, row.no_pool), row) for row in rows]
+            return "raw", [{
+                "t": t,
+                "yes_pct": pct,
+                "yes_pool": row.yes_pool,
+                "no_pool": row.no_pool
+            } for t, pct, row in lttb(raw, points)]
+
+    resolution = next((s for s in ROLLUP_LEVELS if span / s <= row_limit), ROLLUP_LEVELS[-1])
+    Rollup = models.PriceRollup
+    # Align to the bucket containing `start` so the first bucket isn't dropped
+    first_bucket = from_epoch(to_epoch(start) - to_epoch(start) % resolution)
+    rows = (await db.execute(
+        select(
+            Rollup.bucket_start, Rollup.yes_pool, Rollup.no_pool,
+            Rollup.low_pct, Rollup.high_pct, Rollup.bets
+        ).where(
+            Rollup.market_id == market_id,
+            Rollup.resolution == resolution,
+            Rollup.bucket_start >= first_bucket,
+            Rollup.bucket_start <= end
+        ).order_by(Rollup.bucket_start).limit(row_limit)
+    )).all()
+    buckets = [(to_epoch(row.bucket_start), yes_probability(row.yes_pool, row.no_pool), row) for row in rows]
+    return resolution, [{
+        "t": t,
+        "yes_pct": pct,
+        "yes_pool": row.yes_pool,
+        "no_pool": row.no_pool,
+        "low_pct": row.low_pct,
+        "high_pct": row.high_pct,
+        "bets": row.bets
+    } for t, pct, row in lttb(buckets, points)]
+
+
+# --- BACKFILL ---
+def backfill(db):
+    """
+    Seeds one point at the current pools for markets with no history yet.
+    Votes carry no timestamp, so older history can't be reconstructed.
+    """
+    seeded = 0
+    has_history = select(models.PricePoint.id).where(models.PricePoint.market_id == models.Market.id).exists()
+    for market in db.execute(select(models.Market).where(~has_history)).scalars().all():
+        record(db, market.id, market.yes_pool or 0, market.no_pool or 0)
+        seeded += 1
+    db.commit()
+    return seeded
+
+
+if __name__ == "__main__":
+    # python -m app.history  -> backfill markets created before price history existed
+    from .database import SessionLocal
+    from .migrate import migrate
+    migrate()
+    db = SessionLocal()
+    try:
+        print(f"Seeded price history for {backfill(db)} markets")
+    finally:
+        db.close()
@@ -0,0 +1,70 @@
+# app/httpcache.py
+"""
+ETags and Cache-Control for the read-heavy HTML pages.
+
+A page's tag is a hash of the inputs its template renders from (pools,
+comment counts, leaderboard entries, the viewer's navbar), so a route can
+answer If-None-Match with a 304 before rendering anything. Anonymous
+pages are public for a few seconds at the edge; pages for a logged-in
+viewer are private and revalidated on every request.
+"""
+from fastapi import Request
+from fastapi.responses import Response
+from pathlib import Path
+import hashlib
+import os
+
+# How long the CDN may serve an anonymous page without asking us, and how much longer it may serve it while revalidating
+HTTP_CACHE_S_MAXAGE = int(os.getenv("HTTP_CACHE_S_MAXAGE", "5"))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", "30"))
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+_templates_version = None
+
+
+def templates_version():
+    """Digest of the template sources, so a deploy that changes the markup changes every tag."""
+    global _templates_version
+    if _templates_version is None:
+        digest = hashlib.blake2b(digest_size=8)
+        for path in sorted(TEMPLATES_DIR.glob("*.html")):
+            digest.update(path.name.encode())
+            digest.update(path.read_bytes())
+        _templates_version = digest.hexdigest()
+    return _templates_version
+
+
+def viewer(user):
+    """The parts of the logged-in user that the navbar shows."""
+    return (user.id, user.username, user.balance) if user else None
+
+
+def etag(*parts):
+    digest = hashlib.blake2b(repr((templates_version(),) + parts).encode(), digest_size=12).hexdigest()
+    # Weak: the tag names the page's state, and proxies may re-encode the bytes
+    return f'W/"{digest}"'
+
+
+def headers(tag, user):
+    if user:
+        cache_control = "private, no-cache"
+    else:
+        cache_control = (f"public, max-age=0, s-maxage={HTTP_CACHE_S_MAXAGE}, "
+                         f"stale-while-revalidate={HTTP_CACHE_STALE_WHILE_REVALIDATE}")
+    # The session cookie decides whose navbar is on the page
+    return {"ETag": tag, "Cache-Control": cache_control, "Vary": "Cookie"}
+
+
+def is_fresh(request: Request, tag):
+    """True when If-None-Match already names this tag (weak comparison, per RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = tag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in header.split(","))
+
+
+def not_modified(tag, user):
+    return Response(status_code=304, headers=headers(tag, user))
@@ -0,0 +1,42 @@
+# app/identity.py
+
+from collections import namedtuple
+from sqlalchemy import select
+import os
+
+from . import models, cache
+
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "30"))
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+
+# Everything page templates and admin checks need from the logged-in user.
+# Immutable, so a cached copy can be shared across requests safely.
+SessionUser = namedtuple("SessionUser", ["id", "username", "balance"])
+
+users = cache.TTLCache(ttl=IDENTITY_CACHE_TTL, maxsize=IDENTITY_CACHE_SIZE)
+
+
+async def load(db, user_id):
+    """
+    Returns the SessionUser for user_id, hitting the DB only on a cache miss.
+    None means the user no longer exists.
+    """
+    user = users.get(user_id)
+    if user is None:
+        row = (await db.execute(
+            select(models.User.id, models.User.username, models.User.balance).where(models.User.id == user_id)
+        )).first()
+        if row is None:
+            return None
+        user = SessionUser(*row)
+        users.set(user_id, user)
+    return user
+
+
+def forget(user_id):
+    """
+    Call after anything changes a user's balance or deletes them.
+    Only clears this process; other instances catch up within the TTL,
+    and the bet guard in betting.py never trusts a cached balance anyway.
+    """
+    users.invalidate(user_id)
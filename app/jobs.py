@@ -0,0 +1,94 @@
+# app/jobs.py
+"""
+One runner at a time for the chunked background jobs (Settlement in
+settlement.py, UserDeletion in bulk.py).
+
+A runner claims its job with a guarded UPDATE and only works if the claim
+matched. Each chunk then starts by moving the job's last_vote_id cursor
+with a compare-and-set, so if a second runner ever gets in (a takeover of
+a job whose runner stopped heart-beating, say) exactly one of them can
+commit any given chunk; the other rolls back and stops.
+
+heartbeat_at is refreshed with every chunk. A "running" job whose
+heartbeat is older than JOB_LEASE_SECONDS is taken to have crashed and
+can be claimed again.
+"""
+from sqlalchemy import and_, or_, update
+from datetime import datetime, timedelta
+import os
+
+# No chunk takes anywhere near this long, so a silent runner is a dead one
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+CLAIMABLE = ("pending", "failed")
+
+
+def _lease_expired_before():
+    return datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+
+
+def claimable(job):
+    """Whether claim() would hand this job to a new runner right now."""
+    if job.status in CLAIMABLE:
+        return True
+    return job.status == "running" and (job.heartbeat_at is None or job.heartbeat_at < _lease_expired_before())
+
+
+def claim(db, model, job_id):
+    """
+    Marks the job running for this caller, unless a live runner holds it or
+    it's finished. Commits; returns True if the caller got the job.
+    """
+    stale = and_(
+        model.status == "running",
+        or_(model.heartbeat_at == None, model.heartbeat_at < _lease_expired_before())
+    )
+    claimed = db.execute(
+        update(model).where(model.id == job_id, or_(model.status.in_(CLAIMABLE), stale))
+        .values(status="running", heartbeat_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    db.commit()
+    return claimed
+
+
+def advance(db, model, job_id, last_vote_id, new_last_vote_id, **increments):
+    """
+    Moves the cursor from last_vote_id to new_last_vote_id and adds
+    `increments` to counter columns (processed=500, ...). Run it first in a
+    chunk's transaction: its row lock then keeps any other runner out until
+    commit. False means someone else already moved the cursor; roll back
+    and stop.
+    """
+    return db.execute(
+        update(model).where(
+            model.id == job_id,
+            model.status == "running",
+            model.last_vote_id == last_vote_id
+        ).values(
+            last_vote_id=new_last_vote_id,
+            heartbeat_at=datetime.utcnow(),
+            **{name: getattr(model, name) + amount for name, amount in increments.items()}
+        ).execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+
+def bump(db, model, job_id, **increments):
+    """Adds to counter columns and refreshes the heartbeat. Does not commit."""
+    db.execute(
+        update(model).where(model.id == job_id).values(
+            heartbeat_at=datetime.utcnow(),
+            **{name: getattr(model, name) + amount for name, amount in increments.items()}
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def finish(db, model, job_id, status):
+    """Moves a running job to `status` (done / failed) and commits; False if it wasn't running."""
+    finished = db.execute(
+        update(model).where(model.id == job_id, model.status == "running").values(
+            status=status,
+            finished_at=datetime.utcnow() if status == "done" else None
+        ).execution_options(synchronize_session=False)
+    ).rowcount == 1
+    db.commit()
+    return finished
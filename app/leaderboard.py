@@ -0,0 +1,89 @@
+# app/leaderboard.py
+
+from bisect import bisect_left, insort
+from sqlalchemy import select
+import os
+
+from . import models
+from .snapshots import RefreshingSnapshot
+
+# Other instances' balance changes only show up after a rebuild
+LEADERBOARD_TTL = int(os.getenv("LEADERBOARD_TTL", "60"))
+
+
+def _key(user_id, balance):
+    # Richest first, ties by oldest account; packed into one int to keep 1M entries small
+    return (-balance << 32) | user_id
+
+
+class Leaderboard(RefreshingSnapshot):
+    """
+    In-memory ranking of every user by balance.
+    Built with one scan of users (seconds at 1M users, so later rebuilds run
+    in the background), then kept current by set_balance()/remove() from the
+    code paths that move coins (bets, payouts, admin edits), so reads never
+    sort the users table. Rank and neighbour lookups are a bisect; updates
+    are a bisect plus one list insert.
+    """
+    name = "Leaderboard"
+
+    def __init__(self, ttl=LEADERBOARD_TTL):
+        super().__init__(ttl)
+        self._keys = []
+        self._balances = {}
+
+    def load(self, db):
+        rows = db.execute(select(models.User.id, models.User.balance)).all()
+        balances = {user_id: balance or 0 for user_id, balance in rows}
+        return balances, sorted(_key(user_id, balance) for user_id, balance in balances.items())
+
+    def install(self, data):
+        self._balances, self._keys = data
+
+    def set_balance(self, user_id, balance):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            old = self._balances.get(user_id)
+            if old is not None:
+                del self._keys[bisect_left(self._keys, _key(user_id, old))]
+            self._balances[user_id] = balance
+            insort(self._keys, _key(user_id, balance))
+
+    def remove(self, user_id):
+        with self._lock:
+            old = self._balances.pop(user_id, None)
+            if old is not None:
+                del self._keys[bisect_left(self._keys, _key(user_id, old))]
+
+    def _entry(self, index):
+        key = self._keys[index]
+        user_id = key & 0xFFFFFFFF
+        return index + 1, user_id, self._balances[user_id]
+
+    def top(self, n=10):
+        """[(rank, user_id, balance)] for the n richest users."""
+        with self._lock:
+            return [self._entry(i) for i in range(min(n, len(self._keys)))]
+
+    def rank(self, user_id):
+        with self._lock:
+            balance = self._balances.get(user_id)
+            if balance is None:
+                return None
+            return bisect_left(self._keys, _key(user_id, balance)) + 1
+
+    def around(self, user_id, radius=2):
+        """[(rank, user_id, balance)] for the user and up to `radius` users either side."""
+        with self._lock:
+            balance = self._balances.get(user_id)
+            if balance is None:
+                return []
+            index = bisect_left(self._keys, _key(user_id, balance))
+            return [self._entry(i) for i in range(max(0, index - radius), min(len(self._keys), index + radius + 1))]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+board = Leaderboard()
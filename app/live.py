@@ -0,0 +1,99 @@
+# app/live.py
+
+import asyncio
+import os
+
+# Updates for one market within this window go out as a single message
+LIVE_COALESCE_WINDOW = float(os.getenv("LIVE_COALESCE_WINDOW", "0.25"))
+
+
+def market_snapshot(market_id, yes_pool, no_pool, is_open=True, result=None):
+    """Compact payload pushed to /predict/{id} viewers; mirrors calculate_percentages."""
+    total = yes_pool + no_pool
+    yes_pct = 50 if total == 0 else round((yes_pool / total) * 100)
+    return {
+        "market_id": market_id,
+        "yes_pool": yes_pool,
+        "no_pool": no_pool,
+        "yes_pct": yes_pct,
+        "no_pct": 100 - yes_pct,
+        "is_open": is_open,
+        "result": result
+    }
+
+
+class Subscription:
+    """One viewer's mailbox. Holds only the newest snapshot; older ones are dropped unread."""
+
+    def __init__(self, market_id):
+        self.market_id = market_id
+        self.latest = None
+        self._ready = asyncio.Event()
+
+    def _deliver(self, snapshot):
+        self.latest = snapshot
+        self._ready.set()
+
+    async def next(self, timeout=None):
+        """Waits for the next snapshot; returns None on timeout (use it for keep-alives)."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        return self.latest
+
+
+class MarketHub:
+    """
+    In-process fan-out of market snapshots to SSE subscribers.
+    publish() only records the newest snapshot and arms a per-market flush,
+    so a burst of bets costs one pass over the subscribers per window rather
+    than one per bet. Must be called from the event loop. Each instance
+    only reaches viewers connected to it.
+    """
+
+    def __init__(self, window=LIVE_COALESCE_WINDOW):
+        self.window = window
+        self._subscribers = {} # market_id -> set of Subscription
+        self._pending = {} # market_id -> newest unsent snapshot
+        self.published = 0
+        self.flushed = 0
+
+    def subscribe(self, market_id):
+        subscription = Subscription(market_id)
+        self._subscribers.setdefault(market_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._subscribers.get(subscription.market_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.market_id]
+
+    def publish(self, snapshot):
+        market_id = snapshot["market_id"]
+        self.published += 1
+        if market_id not in self._subscribers:
+            return
+        first_in_window = market_id not in self._pending
+        self._pending[market_id] = snapshot
+        if first_in_window:
+            asyncio.get_running_loop().call_later(self.window, self._flush, market_id)
+
+    def _flush(self, market_id):
+        snapshot = self._pending.pop(market_id, None)
+        if snapshot is None:
+            return
+        self.flushed += 1
+        for subscription in tuple(self._subscribers.get(market_id, ())):
+            subscription._deliver(snapshot)
+
+    def subscriber_count(self, market_id=None):
+        if market_id is not None:
+            return len(self._subscribers.get(market_id, ()))
+        return sum(len(subs) for subs in self._subscribers.values())
+
+
+hub = MarketHub()
@@ -1,64 +1,77 @@
 # app/main.py
 
-from fastapi import FastAPI, Request, Form, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi import FastAPI, Request, Form, Query, Depends, HTTPException, status, BackgroundTasks
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
-import bcrypt
-from datetime import datetime
-import requests
-import time
+from datetime import datetime, timedelta
+import jinja2
+import json
 import os 
-from groq import Groq # <--- NEW IMPORT
+import tempfile
+import time
 
-from . import models, database
+from . import models, database, betting, settlement, security, cache, leaderboard, identity, news, ai, live, history, betqueue, metrics, httpcache, search, archive, quotes, bulk, exports, jobs
 
 app = FastAPI(title="PredictHub")
 
 # --- CONFIGURATION ---
-NEWS_API_KEY = os.getenv("NEWS_API_KEY", "")
-GROQ_API_KEY =os.getenv("GROQ_API_KEY")# <--- NEW KEY
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
 
-# --- AI CLIENT SETUP ---
-client = None
-if GROQ_API_KEY:
-    try:
-        client = Groq(api_key=GROQ_API_KEY)
-    except:
-        print("Groq Client failed to initialize")
-
-# --- CACHING SETUP ---
-NEWS_CACHE = {
-    "data": {},
-    "last_fetched": {} 
-}
-CACHE_TIMEOUT = 900 
-
-# --- Security Setup ---
-def get_password_hash(password):
-    pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(pwd_bytes, salt)
-    return hashed.decode('utf-8')
-
-def verify_password(plain_password, hashed_password):
-    pwd_bytes = plain_password.encode('utf-8')
-    hash_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(pwd_bytes, hash_bytes)
+# --- MARKET LIST CACHE ---
+# Rendered card fragments for /markets, keyed by (category, cursor)
+MARKETS_PAGE_SIZE = 40
+MARKET_CATEGORIES = models.MARKET_CATEGORIES
+MARKETS_CACHE_TTL = int(os.getenv("MARKETS_CACHE_TTL", "15"))
+# Relative volume change that makes a cached card too stale to keep serving
+MARKETS_CACHE_POOL_DELTA = float(os.getenv("MARKETS_CACHE_POOL_DELTA", "0.05"))
+markets_cache = cache.TTLCache(ttl=MARKETS_CACHE_TTL, maxsize=256)
+rendered_volume = {} # market_id -> volume shown in the cached cards
+
+def invalidate_markets_cache():
+    markets_cache.clear()
+    rendered_volume.clear()
+
+def note_pool_change(market_id, volume):
+    shown = rendered_volume.get(market_id)
+    if shown is not None and abs(volume - shown) > max(1, shown * MARKETS_CACHE_POOL_DELTA):
+        invalidate_markets_cache()
 
 # --- Database Setup ---
-models.Base.metadata.create_all(bind=database.engine)
+# Tables and indexes come from `python -m app.migrate`, run once per deploy,
+# so importing this module (every cold start) never touches the database.
 
-def get_db():
-    db = database.SessionLocal()
-    try:
+# A logged-in user's committed write keeps them on the primary for a few
+# seconds, so replica lag never hides their own bet or comment. Anonymous
+# requests never touch the session, so cacheable pages get no Set-Cookie.
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+async def get_db(request: Request):
+    async with database.AsyncSessionLocal() as db:
+        yield db
+        # Runs before the response starts, so the session cookie still carries it
+        if db.info.get("committed_write") and request.session.get("user_id"):
+            request.session["primary_until"] = time.time() + READ_YOUR_WRITES_SECONDS
+
+def read_session_factory(request: Request):
+    """A replica, unless this visitor wrote moments ago."""
+    primary_until = request.session.get("primary_until")
+    if primary_until is None:
+        return database.ReplicaSessionLocal
+    if primary_until > time.time():
+        return database.AsyncSessionLocal
+    request.session.pop("primary_until")
+    return database.ReplicaSessionLocal
+
+async def get_read_db(request: Request):
+    """Session for handlers that only read."""
+    async with read_session_factory(request)() as db:
         yield db
-    finally:
-        db.close()
 
 # app/main.py
 
@@ -66,11 +79,11 @@ def get_db():
 
 # --- NEW: GLOBAL CHAT ROUTE ---
 @app.post("/api/global-chat")
-async def global_chat_ai(message: str = Form(...), db: Session = Depends(get_db)):
+async def global_chat_ai(message: str = Form(...), db: AsyncSession = Depends(get_db)):
     """
     General AI Assistant that floats on every page.
     """
-    if not client:
+    if not ai.get_client():
         return JSONResponse({"content": "⚠️ AI is sleeping (Check API Key)."})
 
     # Context about the website for the AI
@@ -94,15 +107,14 @@ async def global_chat_ai(message: str = Form(...), db: Session = Depends(get_db)
     """
 
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
+        content = await ai.complete(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": message}
             ],
-            model="llama-3.3-70b-versatile", # Fast & Free
             temperature=0.7
         )
-        return JSONResponse({"content": chat_completion.choices[0].message.content})
+        return JSONResponse({"content": content})
     except Exception as e:
         print(f"AI Error: {e}")
         return JSONResponse({"content": "⚠️ Connection interrupt. Try again."})
@@ -112,20 +124,100 @@ async def global_chat_ai(message: str = Form(...), db: Session = Depends(get_db)
 # --- Config & Paths ---
 BASE_DIR = Path(__file__).resolve().parent
 app.add_middleware(SessionMiddleware, secret_key="super-secret-temporary-key")
+# Outermost, so its latency covers the session middleware too
+app.add_middleware(metrics.MetricsMiddleware)
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+templates.env.template_class = metrics.TimedTemplate
+# Templates still compile lazily on first render; compiled bytecode is kept on
+# disk (/tmp is the writable spot on Vercel) so warm-ish instances skip the parse
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "predicthub-jinja"))
+try:
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    templates.env.bytecode_cache = jinja2.FileSystemBytecodeCache(JINJA_CACHE_DIR)
+except OSError:
+    print(f"⚠️ Jinja bytecode cache disabled: {JINJA_CACHE_DIR} is not writable")
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
 
 # --- Helper: Get Current User ---
-def get_current_user(request: Request, db: Session):
+async def get_current_user(request: Request, db: AsyncSession):
+    """
+    Returns an identity.SessionUser (id, username, balance), served from the
+    identity cache and memoised on the request so repeat calls are free.
+    """
     user_id = request.session.get("user_id")
     if not user_id:
         return None
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    if not hasattr(request.state, "current_user"):
+        request.state.current_user = await identity.load(db, user_id)
+    return request.state.current_user
 
 # --- Helper: Check if Admin ---
-def is_user_admin(user: models.User):
+def is_user_admin(user: identity.SessionUser):
     return user and user.username == ADMIN_USERNAME
 
+# --- Helper: Keyset Pagination ---
+PAGE_SIZE = 25
+ADMIN_USERS_PAGE_SIZE = 50
+
+async def fetch_merged_page(db: AsyncSession, sources, before=None, page_size=PAGE_SIZE):
+    """
+    Newest-first page over several (query, key) sources whose unique keys
+    never collide, such as a hot table and its archive (archive.py keeps
+    ids, and the hot tables never reuse them). Returns (rows, cursor) where
+    cursor is the `before` value for the next page, or None on the last
+    page. Seeks on the index instead of OFFSET, so deep pages cost the same
+    as the first one.
+    """
+    rows = []
+    for query, key in sources:
+        if before is not None:
+            query = query.where(key < before)
+        rows += [(getattr(row, key.key), row) for row in
+                 (await db.execute(query.order_by(key.desc()).limit(page_size + 1))).scalars().all()]
+    rows = [row for _, row in sorted(rows, key=lambda pair: pair[0], reverse=True)]
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, getattr(rows[-1], sources[0][1].key)
+
+# --- Helper: Comment Threads ---
+COMMENTS_PAGE_SIZE = 20
+EPOCH = datetime(1970, 1, 1)
+
+async def fetch_comments(db: AsyncSession, market_id: int, before: str = None, include_archive: bool = True):
+    """
+    Newest-first page of a market's comments with their authors joined in.
+    `before` is the "<timestamp in µs>-<id>" cursor of the last comment on
+    the previous page; seeking on (market_id, timestamp, id) keeps deep
+    pages as cheap as the first. Archived comments are merged in unless
+    `include_archive` is off (open markets are never archived).
+    Returns (comments, next_cursor).
+    """
+    try:
+        before_us, before_id = (int(part) for part in before.split("-"))
+    except (AttributeError, ValueError):
+        before_us = None
+
+    comments = []
+    for model in (models.Comment, models.ArchivedComment) if include_archive else (models.Comment,):
+        query = select(model).join(model.user).options(contains_eager(model.user)).where(model.market_id == market_id)
+        if before_us is not None:
+            before_ts = EPOCH + timedelta(microseconds=before_us)
+            query = query.where(or_(
+                model.timestamp < before_ts,
+                and_(model.timestamp == before_ts, model.id < before_id)
+            ))
+        comments += (await db.execute(
+            query.order_by(model.timestamp.desc(), model.id.desc()).limit(COMMENTS_PAGE_SIZE + 1)
+        )).scalars().all()
+    comments.sort(key=lambda comment: (comment.timestamp, comment.id), reverse=True)
+
+    if len(comments) <= COMMENTS_PAGE_SIZE:
+        return comments, None
+    comments = comments[:COMMENTS_PAGE_SIZE]
+    last = comments[-1]
+    return comments, f"{(last.timestamp - EPOCH) // timedelta(microseconds=1)}-{last.id}"
+
 def calculate_percentages(market):
     total = market.yes_pool + market.no_pool
     if total == 0:
@@ -134,46 +226,46 @@ def calculate_percentages(market):
     no_pct = 100 - yes_pct 
     return yes_pct, no_pct
 
+# --- Helper: Server-Sent Events ---
+def sse_event(data, event=None):
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
 # --- NEW: AI ANALYSIS ROUTE ---
 @app.post("/api/analyze/{market_id}")
-async def analyze_market_ai(market_id: int, db: Session = Depends(get_db)):
+async def analyze_market_ai(market_id: int, stream: bool = False, db: AsyncSession = Depends(get_db)):
     """
     Uses Groq Llama3 to analyze the market question.
+    Cached per market state; ?stream=true relays tokens as Server-Sent Events.
     """
-    if not client:
+    if not ai.get_client():
         return JSONResponse({"content": "⚠️ AI is currently offline (API Key missing)."})
 
-    market = db.query(models.Market).filter(models.Market.id == market_id).first()
+    market = await db.get(models.Market, market_id)
     if not market:
         return JSONResponse({"content": "Market not found."})
 
-    # Prepare the prompt
-    prompt = f"""
-    You are a professional prediction market analyst (like on Polymarket).
-    Market Question: "{market.question}"
-    Description: "{market.description}"
-    Category: {market.category}
-    Current Pool: {market.yes_pool + market.no_pool} coins.
-    
-    Provide a concise, 2-3 sentence analysis of this event. 
-    Focus on probabilities or key news factors to consider. 
-    Do not be neutral—sound like a smart crypto trader.
-    """
+    if stream:
+        async def events():
+            try:
+                async for delta in ai.analyze_stream(market):
+                    yield sse_event({"content": delta})
+                yield sse_event({}, event="done")
+            except Exception as e:
+                print(f"AI Error: {e}")
+                yield sse_event({"content": "⚠️ AI Analysis failed. Try again later."}, event="error")
+        return StreamingResponse(events(), media_type="text/event-stream")
 
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile", 
-        )
-        return JSONResponse({"content": chat_completion.choices[0].message.content})
+        return JSONResponse({"content": await ai.analyze(market)})
     except Exception as e:
         return JSONResponse({"content": "⚠️ AI Analysis failed. Try again later."})
 
 # --- ROUTES ---
 
 @app.get("/", response_class=HTMLResponse)
-async def read_home(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
+async def read_home(request: Request, db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(request, db)
     return templates.TemplateResponse("home.html", {
         "request": request, 
         "user": user,
@@ -181,41 +273,12 @@ async def read_home(request: Request, db: Session = Depends(get_db)):
     })
 
 @app.get("/news", response_class=HTMLResponse)
-def read_news(request: Request, category: str = "general", refresh: bool = False, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
+async def read_news(request: Request, category: str = "general", refresh: bool = False, db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(request, db)
+    category = news.known_category(category)
     
-    current_time = time.time()
-    articles = []
-    error = None
-
-    if refresh and category in NEWS_CACHE["data"]:
-        del NEWS_CACHE["data"][category]
-
-    if category in NEWS_CACHE["data"] and (current_time - NEWS_CACHE["last_fetched"].get(category, 0) < CACHE_TIMEOUT):
-        articles = NEWS_CACHE["data"][category]
-    else:
-        search_terms = {
-            "general": "india news",
-            "business": "india business market stocks",
-            "technology": "india technology startup crypto",
-            "sports": "india cricket sports",
-            "bollywood": "bollywood movies",
-            "politics": "india politics government"
-        }
-        query = search_terms.get(category, "india")
-        url = f"https://newsapi.org/v2/everything?q={query}&language=en&sortBy=publishedAt&apiKey={NEWS_API_KEY}"
-
-        try:
-            response = requests.get(url, timeout=5)
-            data = response.json()
-            if data.get("status") == "ok":
-                articles = data.get("articles", [])[:20]
-                NEWS_CACHE["data"][category] = articles
-                NEWS_CACHE["last_fetched"][category] = current_time
-            else:
-                error = data.get("message", "Unable to fetch news.")
-        except Exception as e:
-            error = "Connection error to News API."
+    # Served from the news client's cache; misses for a category share one upstream call
+    articles, error = await news.news_client.get(category, refresh)
 
     return templates.TemplateResponse("news.html", {
         "request": request,
@@ -237,21 +300,27 @@ async def register_submit(
     request: Request, 
     username: str = Form(...), 
     password: str = Form(...), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    existing_user = db.query(models.User).filter(models.User.username == username).first()
+    existing_user = (await db.execute(
+        select(models.User).where(models.User.username == username)
+    )).scalar_one_or_none()
     if existing_user:
         return templates.TemplateResponse("register.html", {"request": request, "error": "Username taken"})
     
-    hashed_pw = get_password_hash(password)
+    # bcrypt runs on the bounded password pool so it never blocks the event loop
+    try:
+        hashed_pw = await security.hash_password(password)
+    except security.PasswordPoolBusy:
+        return templates.TemplateResponse("register.html", {"request": request, "error": "Server busy, try again in a moment."}, status_code=503)
     new_user = models.User(username=username, hashed_password=hashed_pw, balance=1000)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.flush()
     
     txn = models.Transaction(user_id=new_user.id, amount=1000, description="Welcome Bonus 🎁")
     db.add(txn)
-    db.commit()
+    await db.commit()
+    leaderboard.board.set_balance(new_user.id, new_user.balance)
     
     return RedirectResponse(url="/login", status_code=303)
 
@@ -264,10 +333,16 @@ async def login_submit(
     request: Request, 
     username: str = Form(...), 
     password: str = Form(...), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+    user = (await db.execute(
+        select(models.User).where(models.User.username == username)
+    )).scalar_one_or_none()
+    try:
+        valid = user is not None and await security.check_password(password, user.hashed_password)
+    except security.PasswordPoolBusy:
+        return templates.TemplateResponse("login.html", {"request": request, "error": "Server busy, try again in a moment."}, status_code=503)
+    if not valid:
         return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"})
     
     request.session["user_id"] = user.id
@@ -279,75 +354,206 @@ async def logout(request: Request):
     return RedirectResponse(url="/", status_code=303)
 
 @app.get("/profile", response_class=HTMLResponse)
-async def read_profile(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
+async def read_profile(
+    request: Request,
+    bets_before: int = None,
+    txns_before: int = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    user = await get_current_user(request, db)
     if not user:
         return RedirectResponse(url="/login", status_code=303)
     
-    user_votes = db.query(models.Vote).filter(models.Vote.user_id == user.id).all()
-    transactions = db.query(models.Transaction).filter(
-        models.Transaction.user_id == user.id
-    ).order_by(models.Transaction.timestamp.desc()).all()
+    # profile.html reads vote.market.*, so join markets into the same query;
+    # archived bets and transactions (archive.py) are merged in by id
+    user_votes, next_bets = await fetch_merged_page(db, [
+        (select(model).join(model.market).options(contains_eager(model.market)).where(model.user_id == user.id), model.id)
+        for model in (models.Vote, models.ArchivedVote)
+    ], bets_before)
+    transactions, next_txns = await fetch_merged_page(db, [
+        (select(model).where(model.user_id == user.id), model.id)
+        for model in (models.Transaction, models.ArchivedTransaction)
+    ], txns_before)
     
     return templates.TemplateResponse("profile.html", {
         "request": request, 
         "user": user, 
         "votes": user_votes,
         "transactions": transactions,
+        "next_bets": next_bets,
+        "next_txns": next_txns,
         "is_admin": is_user_admin(user)
     })
 
+async def leaderboard_entries(db: AsyncSession, entries):
+    """Attaches usernames to (rank, user_id, balance) tuples with one PK lookup."""
+    ids = [user_id for _, user_id, _ in entries]
+    names = dict((await db.execute(
+        select(models.User.id, models.User.username).where(models.User.id.in_(ids))
+    )).all()) if ids else {}
+    return [
+        {"rank": rank, "id": user_id, "username": names[user_id], "balance": balance}
+        for rank, user_id, balance in entries if user_id in names
+    ]
+
 @app.get("/leaderboard", response_class=HTMLResponse)
-async def leaderboard_page(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    top_users = db.query(models.User).order_by(models.User.balance.desc()).limit(10).all()
-    
+async def leaderboard_page(request: Request, db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(request, db)
+    # Ranks come from the in-memory board; the DB only supplies usernames
+    await db.run_sync(leaderboard.board.ensure_fresh)
+    top_entries = leaderboard.board.top(10)
+
+    my_rank, neighbour_entries = None, []
+    if user:
+        my_rank = leaderboard.board.rank(user.id)
+        if my_rank and my_rank > 10:
+            neighbour_entries = leaderboard.board.around(user.id)
+
+    # Usernames never change, so the board entries alone version the page
+    tag = httpcache.etag("leaderboard", top_entries, my_rank, neighbour_entries, httpcache.viewer(user))
+    if httpcache.is_fresh(request, tag):
+        return httpcache.not_modified(tag, user)
+
     return templates.TemplateResponse("leaderboard.html", {
         "request": request,
         "user": user,
-        "top_users": top_users,
+        "top_users": await leaderboard_entries(db, top_entries),
+        "my_rank": my_rank,
+        "neighbours": await leaderboard_entries(db, neighbour_entries) if neighbour_entries else [],
         "is_admin": is_user_admin(user)
+    }, headers=httpcache.headers(tag, user))
+
+@app.get("/api/leaderboard/me")
+async def leaderboard_me(request: Request, radius: int = 2, db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(request, db)
+    if not user:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+
+    await db.run_sync(leaderboard.board.ensure_fresh)
+    return JSONResponse({
+        "rank": leaderboard.board.rank(user.id),
+        "total": len(leaderboard.board),
+        "neighbours": await leaderboard_entries(db, leaderboard.board.around(user.id, min(radius, 25)))
     })
 
 # --- MARKET ROUTES ---
 
+async def render_market_cards(db: AsyncSession, category: str = None, after: str = None):
+    """
+    Renders one page of market cards, open markets first and newest first.
+    `after` is the "<is_open>-<id>" cursor of the last card on the previous
+    page; seeking on (is_open, id) keeps every page an index range scan.
+    """
+    query = select(models.Market)
+    if category:
+        query = query.where(models.Market.category == category)
+
+    try:
+        after_open, after_id = (int(part) for part in after.split("-"))
+    except (AttributeError, ValueError):
+        after_open = None
+    if after_open == 1:
+        query = query.where(or_(
+            models.Market.is_open == False,
+            and_(models.Market.is_open == True, models.Market.id < after_id)
+        ))
+    elif after_open == 0:
+        query = query.where(models.Market.is_open == False, models.Market.id < after_id)
+
+    markets = (await db.execute(
+        query.order_by(models.Market.is_open.desc(), models.Market.id.desc()).limit(MARKETS_PAGE_SIZE + 1)
+    )).scalars().all()
+    next_cursor = None
+    if len(markets) > MARKETS_PAGE_SIZE:
+        markets = markets[:MARKETS_PAGE_SIZE]
+        next_cursor = f"{int(markets[-1].is_open)}-{markets[-1].id}"
+
+    for market in markets:
+        rendered_volume[market.id] = market.yes_pool + market.no_pool
+    return templates.get_template("market_cards.html").render(
+        markets=markets, next_cursor=next_cursor, category=category
+    )
+
 @app.get("/markets", response_class=HTMLResponse)
-async def read_markets(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    markets = db.query(models.Market).order_by(
-        models.Market.is_open.desc(), 
-        models.Market.id.desc()
-    ).all()
+async def read_markets(
+    request: Request,
+    category: str = None,
+    after: str = None,
+    q: str = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    user = await get_current_user(request, db)
+
+    if q and q.strip():
+        # Search results are too varied to cache; the full-text index keeps them cheap
+        markets, next_cursor = await search.search_markets(db, q, category, after)
+        market_cards = templates.get_template("market_cards.html").render(
+            markets=markets, next_cursor=next_cursor, category=category, query=q
+        )
+    else:
+        # The card grid is the same for every visitor, so it's cached separately from the page shell
+        cache_key = (category, after)
+        market_cards = markets_cache.get(cache_key)
+        if market_cards is None:
+            market_cards = await render_market_cards(db, category, after)
+            markets_cache.set(cache_key, market_cards)
+
+    # Versioned by the cards themselves, so a 304 means exactly "same grid, same navbar"
+    tag = httpcache.etag("markets", category, q, market_cards, httpcache.viewer(user))
+    if httpcache.is_fresh(request, tag):
+        return httpcache.not_modified(tag, user)
+
     return templates.TemplateResponse("markets.html", {
         "request": request,
-        "markets": markets,
+        "market_cards": market_cards,
+        "categories": MARKET_CATEGORIES,
+        "current_category": category,
+        "search_query": q,
         "user": user,
         "is_admin": is_user_admin(user)
-    })
+    }, headers=httpcache.headers(tag, user))
 
 @app.get("/predict/{market_id}", response_class=HTMLResponse)
-async def read_predict(request: Request, market_id: int, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    market = db.query(models.Market).filter(models.Market.id == market_id).first()
+async def read_predict(request: Request, market_id: int, db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(request, db)
+    market = await db.get(models.Market, market_id)
     if not market:
         return HTMLResponse("Market not found", status_code=404)
 
     previous_choice = None
     previous_wager = 0
     if user:
-        existing_vote = db.query(models.Vote).filter(
-            models.Vote.user_id == user.id, 
-            models.Vote.market_id == market_id
-        ).first()
+        existing_vote = (await db.execute(
+            select(models.Vote).where(
+                models.Vote.user_id == user.id, 
+                models.Vote.market_id == market_id
+            )
+        )).scalar_one_or_none()
+        if not existing_vote and not market.is_open:
+            existing_vote = (await db.execute(
+                select(models.ArchivedVote).where(
+                    models.ArchivedVote.user_id == user.id,
+                    models.ArchivedVote.market_id == market_id
+                )
+            )).scalar_one_or_none()
         if existing_vote:
             previous_choice = existing_vote.choice
             previous_wager = existing_vote.wager
-    
+
+    # Comment count and newest id stand in for the first page of the thread (an index-only lookup)
+    comment_count, last_comment_id = (await db.execute(
+        select(func.count(models.Comment.id), func.max(models.Comment.id)).where(models.Comment.market_id == market_id)
+    )).one()
+    tag = httpcache.etag(
+        "predict", market.id, market.question, market.description, market.category, market.is_open, market.result,
+        market.yes_pool, market.no_pool, comment_count, last_comment_id,
+        previous_choice, previous_wager, httpcache.viewer(user)
+    )
+    if httpcache.is_fresh(request, tag):
+        return httpcache.not_modified(tag, user)
+
     yes_pct, no_pct = calculate_percentages(market)
-    
-    comments = db.query(models.Comment).filter(
-        models.Comment.market_id == market_id
-    ).order_by(models.Comment.timestamp.desc()).all()
+    comments, comments_cursor = await fetch_comments(db, market_id, include_archive=not market.is_open)
 
     return templates.TemplateResponse("predict.html", {
         "request": request,
@@ -359,10 +565,11 @@ async def read_predict(request: Request, market_id: int, db: Session = Depends(g
         "user": user,
         "is_admin": is_user_admin(user),
         "comments": comments,
+        "comments_cursor": comments_cursor,
         # NEW: Pass pool data for JS Calculator
         "yes_pool": market.yes_pool,
         "no_pool": market.no_pool
-    })
+    }, headers=httpcache.headers(tag, user))
 
 @app.post("/predict/{market_id}", response_class=HTMLResponse)
 async def submit_prediction(
@@ -370,10 +577,12 @@ async def submit_prediction(
     market_id: int, 
     choice: str = Form(...),
     wager: int = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = get_current_user(request, db)
-    market = db.query(models.Market).filter(models.Market.id == market_id).first()
+    user = await get_current_user(request, db)
+    market = await db.get(models.Market, market_id)
+    if not market:
+        return HTMLResponse("Market not found", status_code=404)
     
     if not market.is_open:
         return HTMLResponse("Error: This market is closed.", status_code=400)
@@ -381,39 +590,28 @@ async def submit_prediction(
     if not user:
          return RedirectResponse(url="/login", status_code=303)
 
-    if wager <= 0:
-        return HTMLResponse("Error: Wager must be positive.", status_code=400)
-    if wager > user.balance:
-        return HTMLResponse("Error: Insufficient funds!", status_code=400)
-
-    existing_vote = db.query(models.Vote).filter(
-        models.Vote.user_id == user.id, 
-        models.Vote.market_id == market_id
-    ).first()
-
-    if existing_vote:
-        return HTMLResponse("Error: You have already bet on this market.", status_code=400)
-
-    user.balance -= wager
-    new_vote = models.Vote(user_id=user.id, market_id=market_id, choice=choice, wager=wager)
-    db.add(new_vote)
-    
-    txn = models.Transaction(
-        user_id=user.id, 
-        amount=-wager, 
-        description=f"Bet on {market.question} ({choice.upper()})"
-    )
-    db.add(txn)
-    
-    if choice == "yes": market.yes_pool += wager
-    else: market.no_pool += wager
-
-    db.commit()
-    db.refresh(market)
+    # Debit, pool bump, Vote and Transaction all happen in one guarded transaction,
+    # either per request or shared with a micro-batch of bets on this market
+    try:
+        if betqueue.BET_GROUP_COMMIT:
+            await betqueue.bet_queue.submit(user.id, market_id, choice, wager)
+            # Committed by the queue's own session, so flag it for get_db
+            db.info["committed_write"] = True
+        else:
+            await db.run_sync(betting.place_bet, user.id, market_id, choice, wager)
+    except betting.BetRejected as e:
+        return HTMLResponse(f"Error: {e}", status_code=400)
+    await db.refresh(market)
+    # place_bet dropped the cached identity, so this reloads the new balance
+    user = await identity.load(db, user.id)
+    note_pool_change(market_id, market.yes_pool + market.no_pool)
+    quotes.snapshot.set(market.id, market.yes_pool, market.no_pool)
+    live.hub.publish(live.market_snapshot(market.id, market.yes_pool, market.no_pool))
     
     yes_pct, no_pct = calculate_percentages(market)
-    comments = db.query(models.Comment).filter(models.Comment.market_id == market_id).order_by(models.Comment.timestamp.desc()).all()
     
+    # The thread didn't change because of the bet; the page fetches it from
+    # /api/markets/{id}/comments instead of this request querying it again
     return templates.TemplateResponse("predict.html", {
         "request": request,
         "market": market,
@@ -424,33 +622,169 @@ async def submit_prediction(
         "user": user,
         "message": f"Bet placed! {wager} coins deducted.",
         "is_admin": is_user_admin(user),
-        "comments": comments,
+        "comments": None,
         "yes_pool": market.yes_pool,
         "no_pool": market.no_pool
     })
 
+@app.get("/predict/{market_id}/stream")
+async def market_stream(request: Request, market_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Server-Sent Events feed of pool/percentage snapshots for one market.
+    Sends the current state first, then coalesced updates from live.hub.
+    """
+    market = await db.get(models.Market, market_id)
+    if not market:
+        return HTMLResponse("Market not found", status_code=404)
+    snapshot = live.market_snapshot(market.id, market.yes_pool, market.no_pool, market.is_open, market.result)
+    # Streams are long-lived; give the DB connection back before waiting on the hub
+    await db.close()
+
+    subscription = live.hub.subscribe(market_id)
+    async def events():
+        try:
+            yield sse_event(snapshot, event="market")
+            is_open = snapshot["is_open"]
+            while is_open and not await request.is_disconnected():
+                update = await subscription.next(timeout=15)
+                if update is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                is_open = update["is_open"]
+                yield sse_event(update, event="market")
+        finally:
+            live.hub.unsubscribe(subscription)
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.get("/api/markets/{market_id}/history")
+async def market_history(
+    market_id: int,
+    start: float = None,
+    end: float = None,
+    points: int = 200,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Downsampled YES-probability series for charts. start/end are unix
+    seconds; by default the whole life of the market up to now.
+    """
+    if not await db.get(models.Market, market_id):
+        return JSONResponse({"error": "Market not found"}, status_code=404)
+
+    try:
+        end_at = history.from_epoch(end) if end is not None else datetime.utcnow()
+        start_at = history.from_epoch(start) if start is not None else None
+    except (OverflowError, ValueError):
+        # inf, nan or outside the years datetime can hold
+        return JSONResponse({"error": "start and end must be unix seconds"}, status_code=400)
+    if start_at is None:
+        start_at = (await db.execute(
+            select(models.PricePoint.timestamp).where(
+                models.PricePoint.market_id == market_id
+            ).order_by(models.PricePoint.timestamp).limit(1)
+        )).scalar() or end_at
+    if start_at > end_at:
+        return JSONResponse({"error": "start is after end"}, status_code=400)
+
+    resolution, series = await history.series(db, market_id, start_at, end_at, points)
+    return {
+        "market_id": market_id,
+        "start": history.to_epoch(start_at),
+        "end": history.to_epoch(end_at),
+        "resolution": resolution,
+        "points": series
+    }
+
+@app.post("/api/quotes")
+async def quote_payouts(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """
+    Payout previews for many wagers at once:
+    {"quotes": [{"market_id": 1, "choice": "yes", "wager": 50}, ...]}.
+    Pools come from the in-memory snapshot, so a batch costs no queries.
+    """
+    try:
+        items = (await request.json())["quotes"]
+    except (ValueError, KeyError, TypeError):
+        return JSONResponse({"error": 'Send {"quotes": [{"market_id", "choice", "wager"}, ...]}'}, status_code=400)
+    if not isinstance(items, list):
+        return JSONResponse({"error": "quotes must be a list"}, status_code=400)
+    if len(items) > quotes.QUOTE_MAX_ITEMS:
+        return JSONResponse({"error": f"At most {quotes.QUOTE_MAX_ITEMS} quotes per request"}, status_code=413)
+
+    await db.run_sync(quotes.snapshot.ensure_fresh)
+    return JSONResponse({"quotes": quotes.quote(items)})
+
+@app.get("/api/markets/{market_id}/comments")
+async def market_comments(market_id: int, before: str = None, db: AsyncSession = Depends(get_read_db)):
+    """"Load more" for the discussion panel: the next page after `before`."""
+    comments, next_cursor = await fetch_comments(db, market_id, before)
+    return JSONResponse({
+        "comments": [{
+            "id": comment.id,
+            "username": comment.user.username,
+            "content": comment.content,
+            "timestamp": comment.timestamp.isoformat(),
+            "time": comment.timestamp.strftime('%H:%M')
+        } for comment in comments],
+        "next": next_cursor
+    })
+
+@app.get("/api/search")
+async def search_api(
+    request: Request, q: str = "", kind: str = "markets", category: str = None, after: str = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    One search endpoint for both kinds: `kind=markets` (public, best match
+    first) or `kind=users` (admins only, id order). Pages with `after`=next.
+    """
+    if kind == "users":
+        if not is_user_admin(await get_current_user(request, db)):
+            return JSONResponse({"error": "Unauthorized"}, status_code=403)
+        users, next_cursor = await search.search_users(db, q, after)
+        return JSONResponse({
+            "results": [{"id": u.id, "username": u.username, "balance": u.balance} for u in users],
+            "next": next_cursor
+        })
+    if kind != "markets":
+        return JSONResponse({"error": "kind must be 'markets' or 'users'"}, status_code=400)
+
+    markets, next_cursor = await search.search_markets(db, q, category, after)
+    results = []
+    for market in markets:
+        yes_pct, _ = calculate_percentages(market)
+        results.append({
+            "id": market.id, "question": market.question, "category": market.category,
+            "is_open": market.is_open, "result": market.result, "yes_pct": yes_pct,
+            "volume": market.yes_pool + market.no_pool
+        })
+    return JSONResponse({"results": results, "next": next_cursor})
+
 @app.post("/predict/{market_id}/comment", response_class=RedirectResponse)
 async def post_comment(
     market_id: int,
     content: str = Form(...),
     request: Request = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = get_current_user(request, db)
+    user = await get_current_user(request, db)
     if not user:
         return RedirectResponse(url="/login", status_code=303)
     
     if content.strip():
         new_comment = models.Comment(content=content, user_id=user.id, market_id=market_id)
         db.add(new_comment)
-        db.commit()
+        await db.commit()
     return RedirectResponse(url=f"/predict/{market_id}", status_code=303)
 
 # --- ADMIN ROUTES ---
 
 @app.get("/admin/create", response_class=HTMLResponse)
-async def create_market_page(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
+async def create_market_page(request: Request, db: AsyncSession = Depends(get_db)):
+    user = await get_current_user(request, db)
     if not is_user_admin(user):
          return HTMLResponse("Unauthorized Access", status_code=403)
          
@@ -462,100 +796,289 @@ async def create_market_submit(
     question: str = Form(...),
     description: str = Form(...),
     category: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = get_current_user(request, db)
+    user = await get_current_user(request, db)
     if not is_user_admin(user):
         return HTMLResponse("Unauthorized", status_code=403)
 
     new_market = models.Market(question=question, description=description, category=category, is_open=True)
     db.add(new_market)
-    db.commit()
+    await db.commit()
+    invalidate_markets_cache()
+    quotes.snapshot.set(new_market.id, 0, 0)
     return RedirectResponse(url="/markets", status_code=303)
 
+@app.post("/admin/markets/import")
+async def import_markets(
+    request: Request, import_format: str = Query(None, alias="format"), db: AsyncSession = Depends(get_db)
+):
+    """
+    Creates many markets from a CSV or NDJSON file (see bulk.py), either
+    uploaded from the create page or posted as the raw request body.
+    """
+    user = await get_current_user(request, db)
+    if not is_user_admin(user):
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+
+    content_type = request.headers.get("content-type", "")
+    from_form = content_type.startswith("multipart/form-data")
+    if from_form:
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            return HTMLResponse("Choose a file to import.", status_code=400)
+        data, filename = await upload.read(), upload.filename
+    else:
+        data, filename = await request.body(), None
+    if import_format not in ("csv", "ndjson"):
+        import_format = bulk.detect_format(filename, content_type)
+
+    try:
+        rows = bulk.parse_markets(data, import_format)
+    except bulk.ImportRejected as e:
+        if from_form:
+            lines = "".join(f"\nline {error['line']}: {error['error']}" for error in e.errors)
+            return PlainTextResponse(f"Import failed: {e}{lines}", status_code=400)
+        return JSONResponse({"error": str(e), "errors": e.errors}, status_code=400)
+
+    ids = await db.run_sync(bulk.import_markets, rows)
+    invalidate_markets_cache()
+    if from_form:
+        return RedirectResponse(url="/markets", status_code=303)
+    return JSONResponse({"imported": len(ids), "first_id": ids[0], "last_id": ids[-1]})
+
 @app.post("/admin/resolve/{market_id}", response_class=RedirectResponse)
 async def resolve_market(
     request: Request,
     market_id: int,
+    background_tasks: BackgroundTasks,
     outcome: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = get_current_user(request, db)
+    user = await get_current_user(request, db)
     if not is_user_admin(user):
         return HTMLResponse("Unauthorized", status_code=403)
 
-    market = db.query(models.Market).filter(models.Market.id == market_id).first()
-    if market and market.is_open:
-        market.is_open = False
-        market.result = outcome
-        
-        total_pool = market.yes_pool + market.no_pool
-        winning_pool = market.yes_pool if outcome == 'yes' else market.no_pool
-        
-        if winning_pool > 0:
-            votes = db.query(models.Vote).filter(models.Vote.market_id == market_id).all()
-            for vote in votes:
-                if vote.choice == outcome:
-                    share = vote.wager / winning_pool
-                    payout = int(share * total_pool)
-                    vote.user.balance += payout
-                    txn = models.Transaction(
-                        user_id=vote.user.id, 
-                        amount=payout, 
-                        description=f"Won bet on {market.question}!"
-                    )
-                    db.add(txn)
-        db.commit()
+    # Close the market now; payouts run as a chunked background job
+    job = await db.run_sync(settlement.start_settlement, market_id, outcome)
+    if job:
+        invalidate_markets_cache()
+        background_tasks.add_task(settlement.run_settlement, job.id)
+        market = await db.get(models.Market, market_id, populate_existing=True)
+        quotes.snapshot.set(market.id, market.yes_pool, market.no_pool, is_open=False)
+        live.hub.publish(live.market_snapshot(
+            market.id, market.yes_pool, market.no_pool, is_open=False, result=outcome
+        ))
         
     return RedirectResponse(url=f"/predict/{market_id}", status_code=303)
 
+@app.get("/admin/settlements/{market_id}")
+async def settlement_progress(market_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    user = await get_current_user(request, db)
+    if not is_user_admin(user):
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+
+    job = (await db.execute(
+        select(models.Settlement).where(models.Settlement.market_id == market_id)
+    )).scalar_one_or_none()
+    if not job:
+        return JSONResponse({"error": "No settlement for this market."}, status_code=404)
+    return JSONResponse(settlement.progress(job))
+
+@app.post("/admin/settlements/{market_id}/resume")
+async def resume_settlement(
+    market_id: int, request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)
+):
+    user = await get_current_user(request, db)
+    if not is_user_admin(user):
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+
+    job = (await db.execute(
+        select(models.Settlement).where(models.Settlement.market_id == market_id)
+    )).scalar_one_or_none()
+    if not job:
+        return JSONResponse({"error": "No settlement for this market."}, status_code=404)
+    # A live run keeps going on its own; starting another would only lose the claim
+    if jobs.claimable(job):
+        background_tasks.add_task(settlement.run_settlement, job.id)
+    return JSONResponse(settlement.progress(job))
+
+@app.post("/admin/archive")
+async def run_archive(request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+    """Starts an archival pass (see archive.py); meant for a scheduled job."""
+    user = await get_current_user(request, db)
+    if not is_user_admin(user):
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+    background_tasks.add_task(archive.run)
+    return JSONResponse({"status": "started"}, status_code=202)
+
+# --- METRICS ---
+metrics.register_gauge(
+    "predicthub_password_pool", "Password hashing pool: running, queued, peak, completed, rejected.",
+    lambda: {f'state="{k}"': v for k, v in security.password_pool.stats().items() if k != "executor"}
+)
+metrics.register_gauge(
+    "predicthub_password_pool_info", "Password hashing pool executor kind (always 1).",
+    lambda: {f'executor="{security.password_pool.kind}"': 1}
+)
+metrics.register_gauge(
+    "predicthub_bet_queue", "Group-commit bet queue counters.",
+    lambda: {f'stat="{k}"': v for k, v in betqueue.bet_queue.stats().items()}
+)
+metrics.register_gauge(
+    "predicthub_live_subscribers", "Open /predict/{id}/stream connections.",
+    lambda: {"": live.hub.subscriber_count()}
+)
+metrics.register_gauge(
+    "predicthub_db_connections_checked_out", "Async engine pool connections in use.",
+    lambda: {"": getattr(database.async_engine.pool, "checkedout", lambda: 0)()}
+)
+
+# --- EXPORTS ---
+# Profile pages name bets "bets"; the tables call them votes
+EXPORT_KINDS = {"transactions": "transactions", "bets": "votes"}
+
+def export_response(request: Request, kind: str, filename: str, export_format: str, after: int, until: int, **filters):
+    """Streams an exports.py export, gzipped when the client accepts it."""
+    if export_format not in exports.EXPORT_FORMATS:
+        return JSONResponse({"error": "format must be csv or ndjson."}, status_code=400)
+    gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}.{export_format}"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding"
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    body = exports.export(kind, export_format, gzip, after, until, read_session_factory(request), **filters)
+    return StreamingResponse(body, media_type=exports.EXPORT_FORMATS[export_format], headers=headers)
+
+@app.get("/profile/export/{kind}")
+async def export_own_history(
+    request: Request, kind: str, export_format: str = Query("csv", alias="format"),
+    after: int = None, until: int = None, db: AsyncSession = Depends(get_read_db)
+):
+    user = await get_current_user(request, db)
+    if not user:
+        return RedirectResponse(url="/login", status_code=303)
+    if kind not in EXPORT_KINDS:
+        return JSONResponse({"error": "Unknown export."}, status_code=404)
+    return export_response(request, EXPORT_KINDS[kind], f"{user.username}-{kind}", export_format, after, until, user_id=user.id)
+
+@app.get("/admin/export/users/{target_id}/{kind}")
+async def export_user_history(
+    request: Request, target_id: int, kind: str, export_format: str = Query("csv", alias="format"),
+    after: int = None, until: int = None, db: AsyncSession = Depends(get_read_db)
+):
+    user = await get_current_user(request, db)
+    if not is_user_admin(user):
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+    if kind not in EXPORT_KINDS:
+        return JSONResponse({"error": "Unknown export."}, status_code=404)
+    return export_response(request, EXPORT_KINDS[kind], f"user-{target_id}-{kind}", export_format, after, until, user_id=target_id)
+
+@app.get("/admin/export/markets/{market_id}/votes")
+async def export_market_votes(
+    request: Request, market_id: int, export_format: str = Query("csv", alias="format"),
+    after: int = None, until: int = None, db: AsyncSession = Depends(get_read_db)
+):
+    user = await get_current_user(request, db)
+    if not is_user_admin(user):
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+    return export_response(request, "votes", f"market-{market_id}-votes", export_format, after, until, market_id=market_id)
+
+@app.get("/admin/export/ledger")
+async def export_ledger(
+    request: Request, export_format: str = Query("csv", alias="format"),
+    after: int = None, until: int = None, db: AsyncSession = Depends(get_read_db)
+):
+    """Every transaction, hot and archived, for audits."""
+    user = await get_current_user(request, db)
+    if not is_user_admin(user):
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+    return export_response(request, "transactions", "ledger", export_format, after, until)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text exposition of the histograms and gauges in app/metrics.py."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics/bets")
+async def bet_queue_metrics():
+    return JSONResponse({"group_commit": betqueue.BET_GROUP_COMMIT, **betqueue.bet_queue.stats()})
+
+@app.get("/api/metrics/passwords")
+async def password_pool_metrics():
+    return JSONResponse(security.password_pool.stats())
+
 @app.get("/admin/users", response_class=HTMLResponse)
-async def admin_users_dashboard(request: Request, search: str = None, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
+async def admin_users_dashboard(
+    request: Request, search_query: str = Query(None, alias="search"), after: str = None, db: AsyncSession = Depends(get_read_db)
+):
+    user = await get_current_user(request, db)
     if not is_user_admin(user):
          return HTMLResponse("Unauthorized Access", status_code=403)
     
-    query = db.query(models.User)
-    if search:
-        query = query.filter(models.User.username.contains(search))
-    all_users = query.order_by(models.User.id.asc()).all()
+    # Indexed substring search (or every user when empty), a page at a time
+    all_users, next_cursor = await search.search_users(db, search_query, after, ADMIN_USERS_PAGE_SIZE)
+    # Users on this page that are being deleted in the background
+    deletions = {job.user_id: bulk.deletion_progress(job) for job in (await db.execute(
+        select(models.UserDeletion).where(models.UserDeletion.user_id.in_([target.id for target in all_users]))
+    )).scalars()} if all_users else {}
     
     return templates.TemplateResponse("admin_users.html", {
-        "request": request, "user": user, "all_users": all_users,
-        "is_admin": True, "search_query": search
+        "request": request, "user": user, "all_users": all_users, "deletions": deletions,
+        "is_admin": True, "search_query": search_query, "next_cursor": next_cursor
     })
 
 @app.post("/admin/users/update/{target_id}", response_class=RedirectResponse)
 async def admin_update_balance(
-    target_id: int, new_balance: int = Form(...), request: Request = None, db: Session = Depends(get_db)
+    target_id: int, new_balance: int = Form(...), request: Request = None, db: AsyncSession = Depends(get_db)
 ):
-    user = get_current_user(request, db)
+    user = await get_current_user(request, db)
     if not is_user_admin(user):
         return HTMLResponse("Unauthorized", status_code=403)
 
-    target_user = db.query(models.User).filter(models.User.id == target_id).first()
+    target_user = await db.get(models.User, target_id)
     if target_user:
         diff = new_balance - target_user.balance
         target_user.balance = new_balance
         if diff != 0:
             txn = models.Transaction(user_id=target_user.id, amount=diff, description="Admin adjustment 🛠️")
             db.add(txn)
-        db.commit()
+        await db.commit()
+        leaderboard.board.set_balance(target_id, new_balance)
+        identity.forget(target_id)
     return RedirectResponse(url="/admin/users", status_code=303)
 
 @app.post("/admin/users/delete/{target_id}", response_class=RedirectResponse)
-async def admin_delete_user(target_id: int, request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
+async def admin_delete_user(
+    target_id: int, request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)
+):
+    user = await get_current_user(request, db)
     if not is_user_admin(user):
         return HTMLResponse("Unauthorized", status_code=403)
     if user.id == target_id:
         return RedirectResponse(url="/admin/users", status_code=303)
 
-    target_user = db.query(models.User).filter(models.User.id == target_id).first()
-    if target_user:
-        db.query(models.Vote).filter(models.Vote.user_id == target_id).delete()
-        db.query(models.Transaction).filter(models.Transaction.user_id == target_id).delete()
-        db.query(models.Comment).filter(models.Comment.user_id == target_id).delete()
-        db.delete(target_user)
-        db.commit()
-    return RedirectResponse(url="/admin/users", status_code=303)
\ No newline at end of file
+    # Blocks their betting now; bets, pools and history are cleaned up as a
+    # chunked background job. Posting again retries a failed or crashed job;
+    # a double-submit can't start a second runner (jobs.claim).
+    job = await db.run_sync(bulk.start_deletion, target_id)
+    if job and jobs.claimable(job):
+        background_tasks.add_task(bulk.run_deletion, job.id)
+    return RedirectResponse(url="/admin/users", status_code=303)
+
+@app.get("/admin/users/deletions/{target_id}")
+async def user_deletion_progress(target_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    user = await get_current_user(request, db)
+    if not is_user_admin(user):
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+
+    job = (await db.execute(
+        select(models.UserDeletion).where(models.UserDeletion.user_id == target_id)
+    )).scalar_one_or_none()
+    if not job:
+        return JSONResponse({"error": "No deletion for this user."}, status_code=404)
+    return JSONResponse(bulk.deletion_progress(job))
\ No newline at end of file
@@ -0,0 +1,220 @@
+# app/metrics.py
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from numbers import Real
+import os
+import threading
+import time
+
+from sqlalchemy import event
+import jinja2
+
+from . import database
+
+# --- CONFIGURATION ---
+# Adds a Server-Timing header (db / tpl / ext / app) that browser devtools show per request
+SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Fixed-bucket histogram per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {} # label values -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+        for label_values, series in sorted(snapshot):
+            pairs = [f'{k}="{v}"' for k, v in zip(self.labels, label_values)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                bucket_labels = ",".join(pairs + ['le="%s"' % bound])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            label_text = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}_sum{label_text} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+request_seconds = Histogram(
+    "predicthub_http_request_duration_seconds", "Time to response headers, by route template.",
+    ("method", "route", "status")
+)
+sql_statements = Histogram(
+    "predicthub_db_statements_per_request", "SQL statements executed while serving a request.",
+    ("route",), COUNT_BUCKETS
+)
+sql_seconds = Histogram(
+    "predicthub_db_statement_duration_seconds", "Time per SQL statement (requests and background jobs).",
+    ("engine",), (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+)
+template_seconds = Histogram(
+    "predicthub_template_render_seconds", "Jinja render time per template.", ("template",)
+)
+external_seconds = Histogram(
+    "predicthub_external_call_seconds", "Outbound calls and offloaded work: news, llm, bcrypt.",
+    ("service", "outcome")
+)
+HISTOGRAMS = (request_seconds, sql_statements, sql_seconds, template_seconds, external_seconds)
+
+# Gauges sampled at scrape time: name -> (help, callable returning {'k="v"' label text or "": number})
+gauges = {}
+
+def register_gauge(name, help, collect):
+    gauges[name] = (help, collect)
+
+
+# --- PER-REQUEST TIMINGS ---
+class RequestTimings:
+    __slots__ = ("db_count", "db_time", "template_time", "external_time")
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.external_time = 0.0
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_count} queries", '
+            f"tpl;dur={self.template_time * 1000:.1f}, "
+            f"ext;dur={self.external_time * 1000:.1f}, "
+            f"app;dur={total * 1000:.1f}"
+        )
+
+_current = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(service):
+    """Times an outbound call (or offloaded work) into external_seconds and the current request."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        external_seconds.observe(elapsed, service, outcome)
+        timings = _current.get()
+        if timings is not None:
+            timings.external_time += elapsed
+
+class TimedTemplate(jinja2.Template):
+    """Install with `env.template_class = TimedTemplate` before any template loads."""
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            template_seconds.observe(elapsed, self.name or "<string>")
+            timings = _current.get()
+            if timings is not None:
+                timings.template_time += elapsed
+
+
+# --- SQL STATEMENT EVENTS ---
+def instrument_engine(sync_engine, label):
+    """Counts and times every statement on the engine. Async engines pass .sync_engine."""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        sql_seconds.observe(elapsed, label)
+        timings = _current.get()
+        if timings is not None:
+            timings.db_count += 1
+            timings.db_time += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _failed(exception_context):
+        # after_cursor_execute doesn't fire for a failed statement
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+instrument_engine(database.engine, "sync")
+instrument_engine(database.async_engine.sync_engine, "async")
+for index, replica_engine in enumerate(database.replica_engines):
+    instrument_engine(replica_engine.sync_engine, f"replica{index}")
+
+
+# --- ASGI MIDDLEWARE ---
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task hop): one perf_counter
+    pair and a histogram update per request. Latency is measured to the
+    response headers, so long-lived streams count their setup, not their life.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - started
+                # The router stores the matched route in the scope; labelling by its
+                # template ("/predict/{market_id}") keeps the series count bounded
+                route = getattr(scope.get("route"), "path", "unmatched")
+                request_seconds.observe(elapsed, scope["method"], route, str(message["status"]))
+                sql_statements.observe(timings.db_count, route)
+                if SERVER_TIMING:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timings.server_timing(elapsed).encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _current.reset(token)
+
+
+# --- EXPOSITION ---
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, (help, collect) in gauges.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        for label, value in collect().items():
+            if not isinstance(value, Real):
+                # Prometheus samples are numbers; text belongs in a label
+                continue
+            lines.append(f'{name}{{{label}}} {value}' if label else f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,139 @@
+# app/migrate.py
+"""
+Schema setup, run as an explicit step instead of on every cold start:
+
+    python -m app.migrate
+
+Creates missing tables, then any nullable column, index or unique
+constraint the models declare that an older database doesn't have yet
+(create_all only ever creates whole tables), then the search indexes from
+search.py. On SQLite,
+hot tables created before they were AUTOINCREMENT are rebuilt first.
+Safe to re-run.
+"""
+from sqlalchemy import inspect, Index, UniqueConstraint
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable
+
+from . import models, database, search
+
+# Hot tables whose rows archive.py moves out with their ids
+ARCHIVED_TABLES = (
+    (models.Vote, models.ArchivedVote),
+    (models.Comment, models.ArchivedComment),
+    (models.Transaction, models.ArchivedTransaction),
+)
+
+
+def _rebuild_with_autoincrement(engine, existing_tables):
+    """
+    A plain SQLite rowid key hands out max(id) + 1, so once archive.py has
+    moved the newest rows away their ids come back and collide with the
+    archived copies. SQLite can't change a table's key in place: the table
+    is copied into an AUTOINCREMENT one in a single transaction, and its
+    sequence starts above every id used so far, archived ones included.
+    """
+    created = []
+    for hot, archived in ARCHIVED_TABLES:
+        table = hot.__table__
+        if table.name not in existing_tables:
+            continue
+        with engine.connect() as conn:
+            ddl = conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+            ).scalar()
+        if "AUTOINCREMENT" in ddl.upper():
+            continue
+
+        rebuild = f"{table.name}_rebuild"
+        columns = ", ".join(column.name for column in table.columns)
+        create = str(CreateTable(table).compile(dialect=engine.dialect)).replace(
+            f"CREATE TABLE {table.name} (", f"CREATE TABLE {rebuild} (", 1
+        )
+        script = ";\n".join([
+            "BEGIN IMMEDIATE",
+            create,
+            f"INSERT INTO {rebuild} ({columns}) SELECT {columns} FROM {table.name}",
+            f"DROP TABLE {table.name}",
+            f"ALTER TABLE {rebuild} RENAME TO {table.name}",
+            *(str(CreateIndex(index).compile(dialect=engine.dialect)) for index in table.indexes),
+            f"DELETE FROM sqlite_sequence WHERE name = '{table.name}'",
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table.name}', max("
+            f"(SELECT coalesce(max(id), 0) FROM {table.name}), "
+            f"(SELECT coalesce(max(id), 0) FROM {archived.__tablename__}))",
+            "COMMIT"
+        ])
+        raw = engine.raw_connection()
+        try:
+            # executescript runs the whole rebuild, BEGIN to COMMIT, on one DBAPI connection
+            raw.executescript(script)
+            created.append(f"autoincrement {table.name}")
+        except Exception as e:
+            raw.rollback()
+            print(f"⚠️ Could not rebuild {table.name} with AUTOINCREMENT: {e}")
+            continue
+        finally:
+            raw.close()
+
+        with engine.connect() as conn:
+            clashes = conn.exec_driver_sql(
+                f"SELECT count(*) FROM {table.name} JOIN {archived.__tablename__} USING (id)"
+            ).scalar()
+        if clashes:
+            print(f"⚠️ {clashes} {table.name} rows already reuse an archived id; archive.py can't move them")
+    return created
+
+
+def migrate(engine=None):
+    """Brings the database up to the models; returns a list of what was created."""
+    engine = engine or database.engine
+    created = []
+    existing_tables = set(inspect(engine).get_table_names())
+    models.Base.metadata.create_all(bind=engine)
+    created += [f"table {name}" for name in models.Base.metadata.tables if name not in existing_tables]
+    if engine.dialect.name == "sqlite":
+        created += _rebuild_with_autoincrement(engine, existing_tables)
+
+    inspector = inspect(engine)
+    for table in models.Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue # just created, with all of its indexes
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns or not column.nullable:
+                continue
+            with engine.begin() as conn:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                )
+            created.append(f"column {table.name}.{column.name}")
+
+        have = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        have |= {uc["name"] for uc in inspector.get_unique_constraints(table.name)}
+
+        for index in table.indexes:
+            if index.name not in have:
+                index.create(bind=engine)
+                created.append(f"index {index.name}")
+
+        for constraint in table.constraints:
+            if not isinstance(constraint, UniqueConstraint) or not constraint.name or constraint.name in have:
+                continue
+            try:
+                with engine.begin() as conn:
+                    if engine.dialect.name == "sqlite":
+                        # SQLite can't ALTER TABLE ADD CONSTRAINT; a unique index enforces the same thing
+                        Index(constraint.name, *constraint.columns, unique=True).create(bind=conn)
+                    else:
+                        conn.execute(AddConstraint(constraint))
+                created.append(f"unique {constraint.name}")
+            except Exception as e:
+                # Typically existing duplicate rows; the app still runs, just without the guard
+                print(f"⚠️ Could not add {constraint.name} on {table.name}: {e}")
+
+    created += search.install(engine)
+    return created
+
+
+if __name__ == "__main__":
+    changes = migrate()
+    print("\n".join(f"created {change}" for change in changes) if changes else "Schema is up to date.")
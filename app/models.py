@@ -1,11 +1,15 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Float, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Leaderboard rebuilds and rank fallbacks read users in balance order
+        Index("ix_users_balance_id", "balance", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
@@ -16,8 +20,16 @@ class User(Base):
     transactions = relationship("Transaction", back_populates="user")
     comments = relationship("Comment", back_populates="user")
 
+# Categories a market can be filed under (create form, bulk import, /markets filter)
+MARKET_CATEGORIES = ["General", "Sports", "Crypto", "Politics", "Tech", "Weather"]
+
 class Market(Base):
     __tablename__ = "markets"
+    __table_args__ = (
+        # /markets lists open markets first, newest first, optionally per category
+        Index("ix_markets_open_id", "is_open", "id"),
+        Index("ix_markets_category_open_id", "category", "is_open", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     question = Column(String, index=True)
@@ -35,6 +47,14 @@ class Market(Base):
 
 class Vote(Base):
     __tablename__ = "votes"
+    __table_args__ = (
+        # One bet per user per market, enforced by the DB so racing bets can't both land
+        UniqueConstraint("user_id", "market_id", name="uq_votes_user_market"),
+        # Profile bet history pages by id within a user
+        Index("ix_votes_user_id_id", "user_id", "id"),
+        # Ids are never reused (see ARCHIVE below)
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -47,6 +67,11 @@ class Vote(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Profile wallet history pages by id within a user
+        Index("ix_transactions_user_id_id", "user_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -59,6 +84,11 @@ class Transaction(Base):
 # NEW: Comments Table
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Discussion panel pages newest-first within a market; id breaks timestamp ties
+        Index("ix_comments_market_ts", "market_id", "timestamp", "id"),
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text)
@@ -68,4 +98,139 @@ class Comment(Base):
     market_id = Column(Integer, ForeignKey("markets.id"))
     
     user = relationship("User", back_populates="comments")
-    market = relationship("Market", back_populates="comments")
\ No newline at end of file
+    market = relationship("Market", back_populates="comments")
+
+# Last NewsAPI response per category, shared by every instance
+class NewsCache(Base):
+    __tablename__ = "news_cache"
+
+    category = Column(String, primary_key=True)
+    fetched_at = Column(DateTime)
+    payload = Column(Text) # JSON list of articles
+
+# Payout job for a resolved market; last_vote_id lets a crashed run resume,
+# heartbeat_at tells a crashed run from a live one (see jobs.py)
+class Settlement(Base):
+    __tablename__ = "settlements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    market_id = Column(Integer, ForeignKey("markets.id"), unique=True, index=True)
+    outcome = Column(String)
+
+    # Pools are frozen once the market closes, so they're snapshotted here
+    total_pool = Column(Integer)
+    winning_pool = Column(Integer)
+
+    status = Column(String, default="pending") # pending / running / done / failed, then archived (see archive.py)
+    winners = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    paid_out = Column(Integer, default=0)
+    last_vote_id = Column(Integer, default=0)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+# Background removal of a user and everything they own (see bulk.py). No foreign
+# key on user_id: the job outlives the user row. last_vote_id lets a crashed run resume,
+# heartbeat_at tells a crashed run from a live one (see jobs.py).
+class UserDeletion(Base):
+    __tablename__ = "user_deletions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, unique=True, index=True)
+    username = Column(String)
+
+    status = Column(String, default="pending") # pending / running / done / failed
+    votes = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    pool_removed = Column(Integer, default=0) # coins taken back out of open markets' pools
+    rows_deleted = Column(Integer, default=0) # transactions, comments and archived rows
+    last_vote_id = Column(Integer, default=0)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+# Append-only pool state after each bet; drives the probability chart
+class PricePoint(Base):
+    __tablename__ = "price_points"
+    __table_args__ = (
+        Index("ix_price_points_market_ts", "market_id", "timestamp"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    market_id = Column(Integer, ForeignKey("markets.id"))
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    yes_pool = Column(Integer)
+    no_pool = Column(Integer)
+
+# PricePoints pre-aggregated per market into fixed buckets (see history.ROLLUP_LEVELS),
+# so long-range charts read a bounded number of rows
+class PriceRollup(Base):
+    __tablename__ = "price_rollups"
+    __table_args__ = (
+        UniqueConstraint("market_id", "resolution", "bucket_start", name="uq_price_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    market_id = Column(Integer, ForeignKey("markets.id"))
+    resolution = Column(Integer) # bucket size in seconds
+    bucket_start = Column(DateTime)
+
+    # Pools as of the last bet in the bucket, plus the YES% range seen within it
+    yes_pool = Column(Integer)
+    no_pool = Column(Integer)
+    low_pct = Column(Float)
+    high_pct = Column(Float)
+    bets = Column(Integer, default=0)
+
+# --- ARCHIVE ---
+# Cold copies of history moved out by archive.py. Rows keep their original ids,
+# so readers can merge hot and archived rows in id order. That needs the hot
+# tables to never hand out an id again once its row has moved: Postgres
+# sequences don't, and on SQLite the hot tables are AUTOINCREMENT.
+class ArchivedVote(Base):
+    __tablename__ = "archived_votes"
+    __table_args__ = (
+        Index("ix_archived_votes_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    market_id = Column(Integer, ForeignKey("markets.id"), index=True)
+    choice = Column(String)
+    wager = Column(Integer, default=0)
+
+    user = relationship("User")
+    market = relationship("Market")
+
+class ArchivedComment(Base):
+    __tablename__ = "archived_comments"
+    __table_args__ = (
+        Index("ix_archived_comments_market_ts", "market_id", "timestamp", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    content = Column(Text)
+    timestamp = Column(DateTime)
+
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    market_id = Column(Integer, ForeignKey("markets.id"))
+
+    user = relationship("User")
+    market = relationship("Market")
+
+class ArchivedTransaction(Base):
+    __tablename__ = "archived_transactions"
+    __table_args__ = (
+        Index("ix_archived_transactions_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    amount = Column(Integer)
+    description = Column(String)
+    timestamp = Column(DateTime)
+
+    user = relationship("User")
\ No newline at end of file
@@ -0,0 +1,143 @@
+# app/news.py
+
+from datetime import datetime
+import asyncio
+import json
+import os
+import time
+
+from . import models, database, cache, metrics
+
+# --- CONFIGURATION ---
+NEWS_API_KEY = os.getenv("NEWS_API_KEY", "")
+# Overridable so tests and benchmarks can point at a local stub server
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
+CACHE_TIMEOUT = 900 # seconds a category counts as fresh
+STALE_TIMEOUT = int(os.getenv("NEWS_STALE_TIMEOUT", "86400")) # how long stale articles may still be served
+# Keep fetched articles in the news_cache table so cold instances start warm
+SHARED_CACHE = os.getenv("NEWS_SHARED_CACHE", "1") == "1"
+
+SEARCH_TERMS = {
+    "general": "india news",
+    "business": "india business market stocks",
+    "technology": "india technology startup crypto",
+    "sports": "india cricket sports",
+    "bollywood": "bollywood movies",
+    "politics": "india politics government"
+}
+
+
+def known_category(category):
+    """
+    The category itself if it's one of SEARCH_TERMS, otherwise "general".
+    Only these ever reach the caches or NewsAPI, so query strings can't add
+    upstream calls or news_cache rows.
+    """
+    return category if category in SEARCH_TERMS else "general"
+
+
+class NewsError(Exception):
+    """Upstream answered with an error or couldn't be reached."""
+
+
+class NewsClient:
+    """
+    Async NewsAPI client with one pooled HTTP connection set per process.
+    Concurrent misses for a category share a single upstream call, and a
+    stale category is served immediately while it refreshes in the background.
+    """
+
+    def __init__(self):
+        self._http = None
+        self._entries = {} # category -> (fetched_at, articles)
+        self._flights = cache.SingleFlight()
+
+    def _client(self):
+        if self._http is None:
+            # Deferred to first use so cold starts that never serve /news don't import httpx
+            import httpx
+            self._http = httpx.AsyncClient(
+                timeout=5,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            )
+        return self._http
+
+    async def get(self, category, refresh=False):
+        """Returns (articles, error); error is None on success."""
+        category = known_category(category)
+        entry = self._entries.get(category)
+        if SHARED_CACHE and not refresh and (entry is None or time.time() - entry[0] >= CACHE_TIMEOUT):
+            # Another instance may have refreshed this category already
+            shared = await self._load_shared(category)
+            if shared and (entry is None or shared[0] > entry[0]):
+                entry = self._entries[category] = shared
+
+        age = time.time() - entry[0] if entry else None
+        if entry and not refresh and age < CACHE_TIMEOUT:
+            return entry[1], None
+        if entry and not refresh and age < STALE_TIMEOUT:
+            if category not in self._flights:
+                # Nobody awaits a background refresh, so log its failure here
+                self._fetch_once(category).add_done_callback(
+                    lambda t: not t.cancelled() and t.exception() and print(f"News refresh for {category} failed: {t.exception()}")
+                )
+            return entry[1], None
+
+        try:
+            return await asyncio.shield(self._fetch_once(category)), None
+        except NewsError as e:
+            # A failed refresh still beats an empty page if we have anything
+            return (entry[1] if entry else []), str(e)
+
+    def _fetch_once(self, category):
+        return self._flights.run(category, lambda: self._fetch(category))
+
+    async def _fetch(self, category):
+        import httpx
+        params = {
+            "q": SEARCH_TERMS[category],
+            "language": "en",
+            "sortBy": "publishedAt",
+            "apiKey": NEWS_API_KEY
+        }
+        try:
+            with metrics.timed("news"):
+                response = await self._client().get(NEWS_API_URL, params=params)
+                data = response.json()
+        except (httpx.HTTPError, ValueError):
+            raise NewsError("Connection error to News API.")
+        if data.get("status") != "ok":
+            raise NewsError(data.get("message", "Unable to fetch news."))
+
+        articles = data.get("articles", [])[:20]
+        fetched_at = time.time()
+        self._entries[category] = (fetched_at, articles)
+        if SHARED_CACHE:
+            await self._store_shared(category, fetched_at, articles)
+        return articles
+
+    async def _load_shared(self, category):
+        try:
+            async with database.AsyncSessionLocal() as db:
+                row = await db.get(models.NewsCache, category)
+        except Exception as e:
+            print(f"News cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return row.fetched_at.timestamp(), json.loads(row.payload)
+
+    async def _store_shared(self, category, fetched_at, articles):
+        try:
+            async with database.AsyncSessionLocal() as db:
+                await db.merge(models.NewsCache(
+                    category=category,
+                    fetched_at=datetime.fromtimestamp(fetched_at),
+                    payload=json.dumps(articles)
+                ))
+                await db.commit()
+        except Exception as e:
+            print(f"News cache write failed: {e}")
+
+
+news_client = NewsClient()
@@ -0,0 +1,100 @@
+# app/quotes.py
+
+from sqlalchemy import select
+import math
+import os
+
+from . import models
+from .settlement import payout
+from .snapshots import RefreshingSnapshot
+
+# Bets taken by other instances only show up after a reload
+QUOTE_SNAPSHOT_TTL = float(os.getenv("QUOTE_SNAPSHOT_TTL", "2"))
+QUOTE_MAX_ITEMS = int(os.getenv("QUOTE_MAX_ITEMS", "1000"))
+# Larger wagers are refused before any arithmetic; no balance comes close
+QUOTE_MAX_WAGER = int(os.getenv("QUOTE_MAX_WAGER", str(10**12)))
+
+
+class PoolSnapshot(RefreshingSnapshot):
+    """
+    In-memory (yes_pool, no_pool) of every open market, so payout previews
+    never query the database. Loaded with one scan of open markets, kept
+    exact for this instance by set() on every local bet or resolve, and
+    reloaded in the background once older than the TTL.
+    """
+    name = "Quote snapshot"
+
+    def __init__(self, ttl=QUOTE_SNAPSHOT_TTL):
+        super().__init__(ttl)
+        self._pools = {}
+
+    def load(self, db):
+        rows = db.execute(
+            select(models.Market.id, models.Market.yes_pool, models.Market.no_pool).where(models.Market.is_open == True)
+        ).all()
+        return {market_id: (yes_pool or 0, no_pool or 0) for market_id, yes_pool, no_pool in rows}
+
+    def install(self, data):
+        self._pools = data
+
+    def set(self, market_id, yes_pool, no_pool, is_open=True):
+        with self._lock:
+            if is_open:
+                self._pools[market_id] = (yes_pool, no_pool)
+            else:
+                self._pools.pop(market_id, None)
+
+    def get(self, market_id):
+        return self._pools.get(market_id)
+
+    def __len__(self):
+        return len(self._pools)
+
+
+def quote(items, pools=None):
+    """
+    Payout previews for a batch of {"market_id", "choice", "wager"} items,
+    in order. Each is what a new bet of that size would pay if its side
+    won, with the pools as they'd be right after it (the settlement formula
+    applied to the snapshot). Invalid items get an "error" instead.
+    """
+    pools = snapshot if pools is None else pools
+    results = []
+    for item in items:
+        if isinstance(item, dict) and any(isinstance(value, float) and not math.isfinite(value) for value in item.values()):
+            # inf/nan (1e400 in the JSON) can't be converted to int, nor echoed back as JSON
+            results.append({"error": "market_id and wager must be finite numbers."})
+            continue
+        try:
+            market_id, choice, wager = int(item["market_id"]), item["choice"], int(item["wager"])
+        except (KeyError, TypeError, ValueError):
+            results.append({"item": item, "error": "Each quote needs market_id, choice and an integer wager."})
+            continue
+        # Same checks and messages as betting.place_bet
+        if choice not in ("yes", "no"):
+            results.append({"market_id": market_id, "choice": choice, "wager": wager, "error": "Invalid choice."})
+            continue
+        if wager <= 0:
+            results.append({"market_id": market_id, "choice": choice, "wager": wager, "error": "Wager must be positive."})
+            continue
+        if wager > QUOTE_MAX_WAGER:
+            results.append({"market_id": market_id, "choice": choice, "wager": wager, "error": "Wager is too large."})
+            continue
+
+        market_pools = pools.get(market_id)
+        if market_pools is None:
+            results.append({"market_id": market_id, "choice": choice, "wager": wager, "error": "Market is not open."})
+            continue
+        yes_pool, no_pool = market_pools
+        total_pool = yes_pool + no_pool + wager
+        winning_pool = (yes_pool if choice == "yes" else no_pool) + wager
+        paid = payout(wager, total_pool, winning_pool)
+        results.append({
+            "market_id": market_id, "choice": choice, "wager": wager,
+            "payout": paid, "profit": paid - wager,
+            "yes_pool": yes_pool, "no_pool": no_pool
+        })
+    return results
+
+
+snapshot = PoolSnapshot()
@@ -0,0 +1,199 @@
+# app/search.py
+"""
+Indexed search over users and markets.
+
+    users   - username substring match, in id order (the admin filter)
+    markets - every word of the query, prefix-matched, against question
+              and description, best match first
+
+SQLite uses FTS5 tables kept in step with users/markets by triggers: a
+trigram index for usernames (substring, case-insensitive, like the old
+LIKE '%x%') and a word index with prefix indexes for markets. Postgres
+uses a pg_trgm GIN index on users.username and a GIN tsvector index on
+markets. Anything else falls back to LIKE scans. The indexes are
+installed by `python -m app.migrate`.
+
+Both searches page with an opaque cursor: the `after` value for the next
+page, or None on the last one.
+"""
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import re
+
+from . import models
+
+SEARCH_PAGE_SIZE = 20
+MAX_QUERY_WORDS = 8
+# Trigram indexes can't answer shorter substrings; those become username prefix lookups
+TRIGRAM_MIN = 3
+
+# --- INDEX DDL ---
+SQLITE_INDEXES = {
+    "users_fts": [
+        "CREATE VIRTUAL TABLE users_fts USING fts5(username, content='users', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN "
+        "INSERT INTO users_fts(rowid, username) VALUES (new.id, new.username); END",
+        "CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, username) VALUES ('delete', old.id, old.username); END",
+        # Balance updates (every bet) don't name username, so they never fire this
+        "CREATE TRIGGER users_fts_au AFTER UPDATE OF username ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, username) VALUES ('delete', old.id, old.username); "
+        "INSERT INTO users_fts(rowid, username) VALUES (new.id, new.username); END",
+        "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+    ],
+    "markets_fts": [
+        "CREATE VIRTUAL TABLE markets_fts USING fts5(question, description, content='markets', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER markets_fts_ai AFTER INSERT ON markets BEGIN "
+        "INSERT INTO markets_fts(rowid, question, description) VALUES (new.id, new.question, new.description); END",
+        "CREATE TRIGGER markets_fts_ad AFTER DELETE ON markets BEGIN "
+        "INSERT INTO markets_fts(markets_fts, rowid, question, description) "
+        "VALUES ('delete', old.id, old.question, old.description); END",
+        # Pool updates don't touch the text columns, so bets skip this trigger
+        "CREATE TRIGGER markets_fts_au AFTER UPDATE OF question, description ON markets BEGIN "
+        "INSERT INTO markets_fts(markets_fts, rowid, question, description) "
+        "VALUES ('delete', old.id, old.question, old.description); "
+        "INSERT INTO markets_fts(rowid, question, description) VALUES (new.id, new.question, new.description); END",
+        "INSERT INTO markets_fts(markets_fts) VALUES ('rebuild')",
+    ],
+}
+
+# Must match the query expression below exactly for Postgres to use the index
+MARKET_VECTOR = "to_tsvector('simple', coalesce(markets.question, '') || ' ' || coalesce(markets.description, ''))"
+
+POSTGRES_INDEXES = {
+    "pg_trgm": ["CREATE EXTENSION IF NOT EXISTS pg_trgm"],
+    "ix_users_username_trgm": ["CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops)"],
+    "ix_markets_search": [f"CREATE INDEX IF NOT EXISTS ix_markets_search ON markets USING gin (({MARKET_VECTOR}))"],
+}
+
+
+def install(engine):
+    """Creates whichever search indexes are missing; returns their names."""
+    created = []
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            existing = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master"))}
+        for name, statements in SQLITE_INDEXES.items():
+            if name in existing:
+                continue
+            with engine.begin() as conn:
+                for statement in statements:
+                    conn.execute(text(statement))
+            created.append(name)
+    elif engine.dialect.name == "postgresql":
+        for name, statements in POSTGRES_INDEXES.items():
+            try:
+                with engine.begin() as conn:
+                    for statement in statements:
+                        conn.execute(text(statement))
+            except Exception as e:
+                # Managed Postgres may not allow CREATE EXTENSION; search still works, just unindexed
+                print(f"⚠️ Could not create search index {name}: {e}")
+                continue
+            created.append(name)
+    return [f"search index {name}" for name in created]
+
+
+# --- QUERIES ---
+def _dialect(db: AsyncSession):
+    return db.bind.dialect.name
+
+
+def words(q):
+    return re.findall(r"\w+", (q or "").lower())[:MAX_QUERY_WORDS]
+
+
+def _fts_phrase(value):
+    return '"' + value.replace('"', '""') + '"'
+
+
+async def search_users(db: AsyncSession, q: str = None, after: str = None, limit: int = SEARCH_PAGE_SIZE):
+    """
+    Users whose username contains `q` (all users when it's empty), in id
+    order. The cursor is the last id on the page.
+    """
+    q = (q or "").strip()
+    try:
+        after_id = int(after)
+    except (TypeError, ValueError):
+        after_id = 0
+    dialect = _dialect(db)
+
+    if q and dialect == "sqlite" and len(q) >= TRIGRAM_MIN:
+        # Walk the trigram index in rowid order, then load just this page of users
+        ids = (await db.execute(text(
+            "SELECT rowid FROM users_fts WHERE users_fts MATCH :match AND rowid > :after ORDER BY rowid LIMIT :limit"
+        ), {"match": _fts_phrase(q), "after": after_id, "limit": limit + 1})).scalars().all()
+        users = (await db.execute(
+            select(models.User).where(models.User.id.in_(ids)).order_by(models.User.id)
+        )).scalars().all() if ids else []
+    else:
+        query = select(models.User).where(models.User.id > after_id)
+        if q and dialect == "postgresql":
+            query = query.where(models.User.username.icontains(q, autoescape=True))
+        elif q and dialect == "sqlite":
+            # Range on the username index rather than a scan
+            query = query.where(models.User.username >= q, models.User.username < q + "\U0010ffff")
+        elif q:
+            query = query.where(models.User.username.contains(q, autoescape=True))
+        users = (await db.execute(query.order_by(models.User.id).limit(limit + 1))).scalars().all()
+
+    if len(users) <= limit:
+        return users, None
+    users = users[:limit]
+    return users, str(users[-1].id)
+
+
+def _market_matches(dialect, terms):
+    """(SQL selecting id and score for matching markets, params); lower scores rank first."""
+    if dialect == "sqlite":
+        # Question matches weigh double; bm25 is negative, best first
+        return ("SELECT rowid AS id, bm25(markets_fts, 2.0, 1.0) AS score FROM markets_fts WHERE markets_fts MATCH :match",
+                {"match": " ".join(_fts_phrase(term) + "*" for term in terms)})
+    if dialect == "postgresql":
+        return (f"SELECT markets.id AS id, -ts_rank({MARKET_VECTOR}, to_tsquery('simple', :match)) AS score "
+                f"FROM markets WHERE {MARKET_VECTOR} @@ to_tsquery('simple', :match)",
+                {"match": " & ".join(term + ":*" for term in terms)})
+    conditions, params = [], {}
+    for i, term in enumerate(terms):
+        conditions.append(f"(lower(markets.question) LIKE :w{i} OR lower(markets.description) LIKE :w{i})")
+        params[f"w{i}"] = f"%{term}%"
+    return f"SELECT markets.id AS id, 0.0 AS score FROM markets WHERE {' AND '.join(conditions)}", params
+
+
+async def search_markets(db: AsyncSession, q: str, category: str = None, after: str = None, limit: int = SEARCH_PAGE_SIZE):
+    """
+    Markets matching every word of `q` as a prefix, best match first (ties
+    by id). The cursor is "<score>:<id>" of the last market on the page.
+    """
+    terms = words(q)
+    if not terms:
+        return [], None
+
+    matches, params = _market_matches(_dialect(db), terms)
+    sql = f"SELECT m.id, m.score FROM ({matches}) AS m"
+    conditions = []
+    if category:
+        sql += " JOIN markets ON markets.id = m.id"
+        conditions.append("markets.category = :category")
+        params["category"] = category
+    try:
+        after_score, _, after_id = after.rpartition(":")
+        params.update(after_score=float(after_score), after_id=int(after_id))
+        conditions.append("(m.score > :after_score OR (m.score = :after_score AND m.id > :after_id))")
+    except (AttributeError, ValueError):
+        pass
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    params["limit"] = limit + 1
+    rows = (await db.execute(text(sql + " ORDER BY m.score, m.id LIMIT :limit"), params)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1].score!r}:{rows[-1].id}"
+    by_id = {market.id: market for market in (await db.execute(
+        select(models.Market).where(models.Market.id.in_([row.id for row in rows]))
+    )).scalars()} if rows else {}
+    return [by_id[row.id] for row in rows if row.id in by_id], next_cursor
@@ -0,0 +1,97 @@
+# app/security.py
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import bcrypt
+import os
+
+from . import metrics
+
+# --- CONFIGURATION ---
+# "thread" is the default: bcrypt releases the GIL, so threads scale across cores.
+# "process" isolates hashing completely; "inline" runs on the event loop (benchmarks only).
+HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+
+def get_password_hash(password):
+    pwd_bytes = password.encode('utf-8')
+    salt = bcrypt.gensalt()
+    hashed = bcrypt.hashpw(pwd_bytes, salt)
+    return hashed.decode('utf-8')
+
+def verify_password(plain_password, hashed_password):
+    pwd_bytes = plain_password.encode('utf-8')
+    hash_bytes = hashed_password.encode('utf-8')
+    return bcrypt.checkpw(pwd_bytes, hash_bytes)
+
+
+class PasswordPool:
+    """
+    Bounded executor for bcrypt work. At most `workers` hashes run at once and
+    at most `queue_limit` more wait behind them; anything past that is rejected
+    straight away instead of piling up behind a login storm.
+    Counters are only touched from the event loop, so they need no locking.
+    """
+
+    def __init__(self, kind, workers, queue_limit):
+        self.kind = kind
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = None
+        self.pending = 0
+        self.peak = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        # Created on first use so importing the app stays cheap
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise PasswordPoolBusy()
+
+        self.pending += 1
+        self.peak = max(self.peak, self.pending)
+        try:
+            if self.kind == "inline":
+                return fn(*args)
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self):
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "running": min(self.pending, self.workers),
+            "queued": max(0, self.pending - self.workers),
+            "peak": self.peak,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+
+password_pool = PasswordPool(HASH_EXECUTOR, HASH_WORKERS, HASH_QUEUE_LIMIT)
+
+async def hash_password(password):
+    with metrics.timed("bcrypt"):
+        return await password_pool.run(get_password_hash, password)
+
+async def check_password(plain_password, hashed_password):
+    with metrics.timed("bcrypt"):
+        return await password_pool.run(verify_password, plain_password, hashed_password)
@@ -0,0 +1,176 @@
+# app/settlement.py
+
+from sqlalchemy import BigInteger, cast, func, insert, literal, select, update
+from datetime import datetime
+import os
+import sys
+
+from . import models, database, identity, jobs
+from .leaderboard import board
+
+# Winning votes paid per transaction; each chunk commits on its own so a
+# 50k-bettor market never holds one long write transaction.
+CHUNK_SIZE = int(os.getenv("SETTLEMENT_CHUNK_SIZE", "5000"))
+# Paid out; "archived" once archive.py has moved the market's votes away
+FINISHED = ("done", "archived")
+
+
+def payout(wager, total_pool, winning_pool):
+    """
+    Pari-mutuel payout of a winning wager. Works on plain ints (quotes.py
+    previews) and on SQL expressions (run_settlement), so the preview and
+    the real payout share one formula.
+    """
+    return wager * total_pool // winning_pool
+
+
+def start_settlement(db, market_id, outcome):
+    """
+    Closes the market and records a pending Settlement job.
+    Returns the job, or None if the market doesn't exist or is already closed.
+    The close is a guarded UPDATE on is_open, so it also stops betting.py from
+    accepting bets past this point and the pools can be snapshotted safely.
+    """
+    closed = db.execute(
+        update(models.Market).where(
+            models.Market.id == market_id,
+            models.Market.is_open == True
+        ).values(is_open=False, result=outcome).execution_options(synchronize_session=False)
+    )
+    if closed.rowcount == 0:
+        db.rollback()
+        return None
+
+    yes_pool, no_pool = db.execute(
+        select(models.Market.yes_pool, models.Market.no_pool).where(models.Market.id == market_id)
+    ).one()
+    winners = db.execute(
+        select(func.count(models.Vote.id)).where(
+            models.Vote.market_id == market_id,
+            models.Vote.choice == outcome
+        )
+    ).scalar()
+
+    job = models.Settlement(
+        market_id=market_id,
+        outcome=outcome,
+        total_pool=yes_pool + no_pool,
+        winning_pool=yes_pool if outcome == "yes" else no_pool,
+        winners=winners
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def run_settlement(settlement_id):
+    """
+    Pays out a Settlement job in chunks of winning votes ordered by id.
+    Safe to call again after a crash: each chunk's balance UPDATE,
+    Transaction INSERT and last_vote_id bump commit together, so a rerun
+    picks up exactly where the last committed chunk left off. Returns
+    without paying anything if another runner holds the job (jobs.py).
+
+    Payout per vote is wager * total_pool // winning_pool in integer SQL.
+    This is the exact floor of the old int(wager / winning_pool * total_pool);
+    the only difference is that the float version could lose a coin when
+    the quotient was a whole number that floats put just below it.
+    """
+    db = database.SessionLocal()
+    try:
+        if not jobs.claim(db, models.Settlement, settlement_id):
+            print(f"⏳ Settlement {settlement_id} is finished or already running")
+            return
+        job = db.get(models.Settlement, settlement_id)
+        last_vote_id = job.last_vote_id
+
+        if job.winning_pool > 0:
+            market = db.get(models.Market, job.market_id)
+            description = f"Won bet on {market.question}!"
+            amount = payout(cast(models.Vote.wager, BigInteger), job.total_pool, job.winning_pool)
+
+            while True:
+                vote_ids = db.execute(
+                    select(models.Vote.id).where(
+                        models.Vote.market_id == job.market_id,
+                        models.Vote.choice == job.outcome,
+                        models.Vote.id > last_vote_id
+                    ).order_by(models.Vote.id).limit(CHUNK_SIZE)
+                ).scalars().all()
+                if not vote_ids:
+                    break
+
+                chunk = (
+                    models.Vote.market_id == job.market_id,
+                    models.Vote.choice == job.outcome,
+                    models.Vote.id > last_vote_id,
+                    models.Vote.id <= vote_ids[-1]
+                )
+                # The market is closed, so the chunk's votes and payouts are fixed
+                paid_out = db.execute(select(func.coalesce(func.sum(amount), 0)).where(*chunk)).scalar()
+                if not jobs.advance(db, models.Settlement, job.id, last_vote_id, vote_ids[-1],
+                                    processed=len(vote_ids), paid_out=paid_out):
+                    db.rollback()
+                    print(f"⏳ Settlement {settlement_id} was taken over by another runner")
+                    return
+                # One vote per (user, market), so the correlated subquery yields a single row
+                db.execute(
+                    update(models.User).where(
+                        models.User.id.in_(select(models.Vote.user_id).where(*chunk))
+                    ).values(
+                        balance=models.User.balance + select(amount).where(
+                            models.Vote.user_id == models.User.id, *chunk
+                        ).scalar_subquery()
+                    ).execution_options(synchronize_session=False)
+                )
+                db.execute(
+                    insert(models.Transaction).from_select(
+                        ["user_id", "amount", "description", "timestamp"],
+                        select(
+                            models.Vote.user_id,
+                            amount,
+                            literal(description, models.Transaction.description.type),
+                            literal(datetime.utcnow(), models.Transaction.timestamp.type)
+                        ).where(*chunk)
+                    )
+                )
+                paid = db.execute(
+                    select(models.User.id, models.User.balance).where(
+                        models.User.id.in_(select(models.Vote.user_id).where(*chunk))
+                    )
+                ).all()
+                db.commit()
+                last_vote_id = vote_ids[-1]
+                for user_id, balance in paid:
+                    board.set_balance(user_id, balance)
+                    identity.forget(user_id)
+
+        jobs.finish(db, models.Settlement, settlement_id, "done")
+    except Exception as e:
+        print(f"Settlement {settlement_id} failed: {e}")
+        db.rollback()
+        jobs.finish(db, models.Settlement, settlement_id, "failed")
+    finally:
+        db.close()
+
+
+def progress(job):
+    return {
+        "market_id": job.market_id,
+        "outcome": job.outcome,
+        "status": job.status,
+        "winners": job.winners,
+        "processed": job.processed,
+        "paid_out": job.paid_out,
+        "percent": 100 if not job.winners else round(job.processed * 100 / job.winners)
+    }
+
+
+if __name__ == "__main__":
+    # Resume a stuck or failed payout from a shell: python -m app.settlement <market_id>
+    db = database.SessionLocal()
+    job = db.query(models.Settlement).filter(models.Settlement.market_id == int(sys.argv[1])).first()
+    db.close()
+    if job is None:
+        sys.exit("No settlement for that market.")
+    run_settlement(job.id)
@@ -0,0 +1,52 @@
+# app/snapshots.py
+
+import threading
+import time
+
+from . import database
+
+
+class RefreshingSnapshot:
+    """
+    Base for in-memory copies of database state (leaderboard.board,
+    quotes.snapshot). Loaded inline the first time; after that a stale copy
+    keeps serving while a background thread reloads it, so no request waits
+    on the scan. Subclasses implement load(db), which reads without the
+    lock, and install(data), which swaps the result in under it.
+    """
+    name = "Snapshot"
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._loaded_at = None
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    def ensure_fresh(self, db):
+        if self._loaded_at is None:
+            self.rebuild(db)
+        elif time.monotonic() - self._loaded_at >= self.ttl and not self._rebuilding:
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+
+    def _rebuild_in_background(self):
+        db = database.SessionLocal()
+        try:
+            self.rebuild(db)
+        except Exception as e:
+            print(f"{self.name} rebuild failed: {e}")
+        finally:
+            self._rebuilding = False
+            db.close()
+
+    def rebuild(self, db):
+        data = self.load(db)
+        with self._lock:
+            self.install(data)
+            self._loaded_at = time.monotonic()
+
+    def load(self, db):
+        raise NotImplementedError
+
+    def install(self, data):
+        raise NotImplementedError
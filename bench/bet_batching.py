@@ -0,0 +1,97 @@
+# bench/bet_batching.py
+"""
+Per-request commits vs group commit for a burst of bets on one hot market.
+
+    python -m bench.bet_batching --bets 5000 --concurrency 200
+
+Runs the same bets twice against a fresh database: once the way
+submit_prediction does by default (own AsyncSession, place_bet, commit)
+and once through app.betqueue (micro-batches, one commit each). Reports
+throughput, latency percentiles and the ledger check from bench.bet_stress.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from bench.common import use_bench_database, add_reset_argument, reset_schema, percentile
+
+use_bench_database("bet_batching.db")
+
+from sqlalchemy import insert
+
+from app import models, database, betting, betqueue
+from bench.bet_stress import check
+
+
+def seed(users, balance, reset=False):
+    reset_schema(reset)
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"username": f"batch{i}", "hashed_password": "x", "balance": balance} for i in range(users)
+        ])
+        conn.execute(insert(models.Market), [{"question": "Hot market?", "category": "Crypto", "is_open": True}])
+
+
+async def per_request(user_id, choice, wager):
+    async with database.AsyncSessionLocal() as db:
+        await db.run_sync(betting.place_bet, user_id, 1, choice, wager)
+
+
+async def grouped(user_id, choice, wager):
+    await betqueue.bet_queue.submit(user_id, 1, choice, wager)
+
+
+async def run(place, jobs, concurrency):
+    latencies = []
+    outcomes = {"accepted": 0, "rejected": 0, "errored": 0}
+    pending = iter(jobs)
+
+    async def worker():
+        for job in pending:
+            started = time.perf_counter()
+            try:
+                await place(*job)
+                outcomes["accepted"] += 1
+            except betting.BetRejected:
+                outcomes["rejected"] += 1
+            except Exception:
+                outcomes["errored"] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bets", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200, help="bets in flight at once")
+    parser.add_argument("--balance", type=int, default=1000)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    # One bet per user, with a few over-budget wagers so rejections are exercised too
+    jobs = [(i + 1, rng.choice(("yes", "no")), rng.randint(1, args.balance * 11 // 10)) for i in range(args.bets)]
+
+    failed = False
+    for label, place in (("per-request commit", per_request), ("group commit", grouped)):
+        seed(args.bets, args.balance, args.reset)
+        elapsed, latencies, outcomes = asyncio.run(run(place, jobs, args.concurrency))
+        print(f"{label:<20} {args.bets / elapsed:8.0f} bets/s   p50 {percentile(latencies, 50):7.1f} ms   "
+              f"p99 {percentile(latencies, 99):7.1f} ms   {outcomes}")
+        if place is grouped:
+            print(f"{'':<20} {betqueue.bet_queue.stats()}")
+        for problem in check(args.balance, args.bets):
+            print(f"FAIL: {problem}")
+            failed = True
+    if failed:
+        sys.exit(1)
+    print("OK: coins conserved, no overdrafts, no duplicate bets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# bench/bet_stress.py
+"""
+Fires thousands of parallel bets through app.betting.place_bet and checks
+that no coins were created or destroyed.
+
+    python -m bench.bet_stress --bets 5000 --threads 32
+
+Uses a throwaway SQLite file unless BENCH_DATABASE_URL is set, so it can
+also be pointed at a scratch Postgres database (which needs --reset).
+"""
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.common import use_bench_database, add_reset_argument, reset_schema
+
+use_bench_database("bet_stress.db")
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from app import models, database, betting
+
+
+def seed(users, markets, balance, reset=False):
+    reset_schema(reset)
+    db = database.SessionLocal()
+    db.add_all(models.User(username=f"stress{i}", hashed_password="x", balance=balance) for i in range(users))
+    db.add_all(models.Market(question=f"Stress market {i}?", category="Stress", is_open=True) for i in range(markets))
+    db.commit()
+    user_ids = [u for (u,) in db.query(models.User.id)]
+    market_ids = [m for (m,) in db.query(models.Market.id)]
+    db.close()
+    return user_ids, market_ids
+
+
+def fire(user_id, market_id, choice, wager):
+    db = database.SessionLocal()
+    try:
+        betting.place_bet(db, user_id, market_id, choice, wager)
+        return "accepted"
+    except betting.BetRejected:
+        return "rejected"
+    except OperationalError:
+        db.rollback()
+        return "errored"
+    finally:
+        db.close()
+
+
+def check(balance, user_count):
+    """Returns a list of invariant violations (empty when the ledger is consistent)."""
+    db = database.SessionLocal()
+    problems = []
+
+    wallets = db.query(func.coalesce(func.sum(models.User.balance), 0)).scalar()
+    pools = db.query(func.coalesce(func.sum(models.Market.yes_pool + models.Market.no_pool), 0)).scalar()
+    if wallets + pools != balance * user_count:
+        problems.append(f"coins not conserved: wallets {wallets} + pools {pools} != {balance * user_count}")
+
+    negative = db.query(models.User).filter(models.User.balance < 0).count()
+    if negative:
+        problems.append(f"{negative} wallets overdrawn")
+
+    staked = db.query(func.coalesce(func.sum(models.Vote.wager), 0)).scalar()
+    if staked != pools:
+        problems.append(f"pools {pools} != sum of vote wagers {staked}")
+
+    debited = db.query(func.coalesce(func.sum(models.Transaction.amount), 0)).scalar()
+    if -debited != staked:
+        problems.append(f"ledger debits {-debited} != sum of vote wagers {staked}")
+
+    duplicates = db.query(models.Vote.user_id, models.Vote.market_id).group_by(
+        models.Vote.user_id, models.Vote.market_id
+    ).having(func.count() > 1).count()
+    if duplicates:
+        problems.append(f"{duplicates} duplicate (user, market) votes")
+
+    db.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bets", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--markets", type=int, default=50)
+    parser.add_argument("--balance", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    user_ids, market_ids = seed(args.users, args.markets, args.balance, args.reset)
+    # Wagers are sized so most wallets run dry and the funds guard is actually exercised.
+    jobs = [
+        (rng.choice(user_ids), rng.choice(market_ids), rng.choice(("yes", "no")), rng.randint(1, args.balance // 3))
+        for _ in range(args.bets)
+    ]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        outcomes = list(pool.map(lambda job: fire(*job), jobs))
+    elapsed = time.perf_counter() - started
+
+    counts = {k: outcomes.count(k) for k in ("accepted", "rejected", "errored")}
+    print(f"{args.bets} bets on {database.engine.dialect.name} in {elapsed:.2f}s "
+          f"({args.bets / elapsed:.0f} bets/s): {counts}")
+
+    problems = check(args.balance, len(user_ids))
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK: coins conserved, no overdrafts, no duplicate bets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# bench/cold_start.py
+"""
+Cold-start cost: import time of app.main and time to first response.
+
+    python -m bench.cold_start                          # this tree
+    python -m bench.cold_start --compare HEAD~1         # this checkout vs an older commit
+    python -m bench.cold_start --max-first-response-ms 1500   # exit 1 over budget (CI)
+
+Every sample is a fresh interpreter, as on a serverless cold start. Import
+time is measured inside the child around `import app.main`; time to first
+response is from spawning uvicorn until GET /login returns 200 (a page
+render), followed by the first /markets (database + template). The first
+sample of each tree runs with an empty Jinja bytecode cache, the rest warm.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench.common import free_port
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="predicthub-coldstart-")
+
+IMPORT_PROBE = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def prepare_db(tree, path):
+    """Schema for `tree`, created the way that tree does it (older trees create it on import)."""
+    env = dict(os.environ, DATABASE_URL="sqlite:///" + path, PYTHONPATH=tree)
+    script = ("from app.migrate import migrate; migrate()" if os.path.exists(os.path.join(tree, "app", "migrate.py"))
+              else "import app.main")
+    subprocess.run([sys.executable, "-c", script], cwd=tree, env=env, check=True, capture_output=True)
+    return env
+
+
+def import_time(tree, env):
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=tree, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1]) * 1000
+
+
+def slowest_imports(tree, env, top):
+    """(cumulative ms, module) for the heaviest top-level imports under app.main, from -X importtime."""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=tree, env=env,
+                            capture_output=True, text=True)
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and name.startswith("   ") and not name.startswith("    "):
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def first_response(tree, env):
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=tree, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        while True:
+            try:
+                if httpx.get(base_url + "/login", timeout=5).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.perf_counter() - started > 60:
+                raise RuntimeError("server did not answer within 60s")
+            time.sleep(0.01)
+        first = (time.perf_counter() - started) * 1000
+        markets_started = time.perf_counter()
+        httpx.get(base_url + "/markets", timeout=10).raise_for_status()
+        return first, (time.perf_counter() - markets_started) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def measure(tree, label, runs, top):
+    db_path = os.path.join(WORKDIR, f"{label.replace('/', '_')}.db")
+    env = prepare_db(tree, db_path)
+    env["JINJA_CACHE_DIR"] = os.path.join(WORKDIR, f"jinja-{label.replace('/', '_')}")
+
+    imports = [import_time(tree, env) for _ in range(runs)]
+    responses = [first_response(tree, env) for _ in range(runs)]
+    return {
+        "import_ms": round(statistics.median(imports), 1),
+        "first_response_ms": round(statistics.median(r[0] for r in responses), 1),
+        "first_response_cold_cache_ms": round(responses[0][0], 1),
+        "first_markets_ms": round(statistics.median(r[1] for r in responses), 1),
+        "slowest_imports": [[name, round(ms, 1)] for ms, name in slowest_imports(tree, env, top)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list")
+    parser.add_argument("--compare", metavar="REV", help="also measure this git revision")
+    parser.add_argument("--max-import-ms", type=float, help="fail if this tree's median import time is higher")
+    parser.add_argument("--max-first-response-ms", type=float, help="fail if this tree's median first response is slower")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    trees = {"worktree": REPO}
+    if args.compare:
+        trees[args.compare] = os.path.join(WORKDIR, "compare")
+        subprocess.run(["git", "worktree", "add", "--detach", trees[args.compare], args.compare],
+                       cwd=REPO, check=True, capture_output=True)
+    try:
+        results = {label: measure(tree, label, args.runs, args.top) for label, tree in trees.items()}
+    finally:
+        if args.compare:
+            subprocess.run(["git", "worktree", "remove", "--force", trees[args.compare]], cwd=REPO)
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for label, r in results.items():
+            print(f"{label:<10} import {r['import_ms']:>7} ms   first response {r['first_response_ms']:>7} ms "
+                  f"(cold template cache {r['first_response_cold_cache_ms']} ms)   first /markets {r['first_markets_ms']} ms")
+            print("           heaviest imports: " + ", ".join(f"{name} {ms} ms" for name, ms in r["slowest_imports"]))
+
+    mine = results["worktree"]
+    over = []
+    if args.max_import_ms and mine["import_ms"] > args.max_import_ms:
+        over.append(f"import {mine['import_ms']} ms > {args.max_import_ms} ms")
+    if args.max_first_response_ms and mine["first_response_ms"] > args.max_first_response_ms:
+        over.append(f"first response {mine['first_response_ms']} ms > {args.max_first_response_ms} ms")
+    for problem in over:
+        print(f"FAIL: {problem}")
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench/common.py
+"""
+Setup shared by the bench scripts.
+
+Benchmarks never use DATABASE_URL: a shell with the production URL
+exported must not get its tables dropped or filled with synthetic rows.
+use_bench_database() points the app at a throwaway SQLite file, or at
+BENCH_DATABASE_URL when that is set (a scratch Postgres, say), and
+reset_schema() refuses to drop tables in BENCH_DATABASE_URL unless the
+script was run with --reset.
+"""
+import os
+import socket
+import sys
+import tempfile
+
+_bench_url = None
+_throwaway = False
+
+
+def use_bench_database(name):
+    """
+    Sets DATABASE_URL for this process and any server it starts; call it
+    before anything imports app.database. Returns the URL. Later calls
+    (one bench importing another) keep the first choice.
+    """
+    global _bench_url, _throwaway
+    if _bench_url is None:
+        if os.getenv("BENCH_DATABASE_URL"):
+            _bench_url = os.environ["BENCH_DATABASE_URL"]
+        else:
+            _bench_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="predicthub-bench-"), name)
+            _throwaway = True
+    os.environ["DATABASE_URL"] = _bench_url
+    return _bench_url
+
+
+def add_reset_argument(parser):
+    parser.add_argument("--reset", action="store_true",
+                        help="allow dropping every table in BENCH_DATABASE_URL (never needed for the default temp file)")
+
+
+def reset_schema(reset=False):
+    """Drops and recreates every table in the bench database. Outside the throwaway file this needs --reset."""
+    if _bench_url is None:
+        sys.exit("use_bench_database() must run before reset_schema().")
+    if not _throwaway and not reset:
+        sys.exit("Refusing to drop the tables in BENCH_DATABASE_URL; rerun with --reset if that database is disposable.")
+
+    from app import models, database
+    models.Base.metadata.drop_all(bind=database.engine)
+    if database.engine.dialect.name == "sqlite":
+        # The search tables (search.py) aren't in the metadata, so drop_all leaves them behind
+        with database.engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS users_fts")
+            conn.exec_driver_sql("DROP TABLE IF EXISTS markets_fts")
+    models.Base.metadata.create_all(bind=database.engine)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile (pct out of 100) of unsorted samples; nan if there are none."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else float("nan")
+
+
+def free_port():
+    """A localhost port nothing is listening on, for a bench server."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,167 @@
+# bench/export_memory.py
+"""
+Streaming export of a very large ledger within a fixed memory budget.
+
+    python -m bench.export_memory --rows 10000000 --max-growth-mb 64   # exit 1 over budget (CI)
+
+Seeds --rows transactions straight into SQLite, starts a real uvicorn
+worker and downloads /admin/export/ledger (plain and gzipped), counting
+rows and checking they arrive in id order. The server's anonymous RSS
+(heap, sampled every 10ms) is compared with its value just before the
+export: with a server-side cursor the growth stays flat however many
+rows there are. File-backed RSS is reported separately; it's SQLite's
+mmap of the database file (SQLITE_MMAP_SIZE), page cache rather than
+memory the export holds. A resumed download (after=) is checked to start
+exactly where asked.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+WORKDIR = tempfile.mkdtemp(prefix="predicthub-export-")
+DB_PATH = os.path.join(WORKDIR, "export.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_PATH
+os.environ["ADMIN_USERNAME"] = "bench-admin"
+
+import httpx
+
+from app.migrate import migrate
+from bench.common import free_port
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "bench-password"
+
+
+def seed(rows):
+    migrate()
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n LIMIT ?) "
+        "INSERT INTO transactions (user_id, amount, description, timestamp) "
+        "SELECT x % 1000 + 2, (x % 200) - 100, 'Bet on Will event ' || (x % 5000) || ' happen? (YES)', "
+        "datetime('2026-01-01', '+' || (x / 100) || ' seconds') FROM n", (rows,)
+    )
+    conn.commit()
+    conn.close()
+
+
+def memory_kb(pid, field):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+
+
+class PeakSampler:
+    """Polls a process's /proc status in a thread and keeps the highest value of each field."""
+
+    def __init__(self, pid, fields=("RssAnon", "RssFile")):
+        self.pid, self.fields = pid, fields
+        self.peak = {field: memory_kb(pid, field) for field in fields}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            for field in self.fields:
+                self.peak[field] = max(self.peak[field], memory_kb(self.pid, field))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def download(client, path, headers):
+    """Streams one export; returns (rows, last id, bytes on the wire, seconds)."""
+    rows, last_id, wire, tail = 0, 0, 0, b""
+    decompressor = zlib.decompressobj(31) if headers.get("accept-encoding") == "gzip" else None
+    started = time.perf_counter()
+    with client.stream("GET", path, headers=headers) as response:
+        response.raise_for_status()
+        assert response.headers.get("content-encoding", "identity") == headers.get("accept-encoding"), response.headers
+        for chunk in response.iter_raw():
+            wire += len(chunk)
+            lines = (tail + (decompressor.decompress(chunk) if decompressor else chunk)).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                if line.startswith(b"id,"):
+                    continue
+                row_id = int(line[:line.index(b",")])
+                assert row_id > last_id, f"out of order: {row_id} after {last_id}"
+                last_id = row_id
+                rows += 1
+    return rows, last_id, wire, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--max-growth-mb", type=float, help="fail if the server's anonymous RSS grows more than this during an export")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    seed(args.rows)
+    print(f"seeded {args.rows:,} transactions in {time.perf_counter() - started:.1f}s")
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO, env=dict(os.environ, PYTHONPATH=REPO), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    over = []
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+            for _ in range(300):
+                try:
+                    client.get("/login")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            client.post("/register", data={"username": "bench-admin", "password": PASSWORD})
+            client.post("/login", data={"username": "bench-admin", "password": PASSWORD})
+            # The registration bonus is one more row, with id rows + 1
+            expected = args.rows + 1
+
+            # Warm-up, so imports and the first batch are in the baseline
+            download(client, "/admin/export/ledger?until=10000", {"accept-encoding": "identity"})
+            for encoding in ("identity", "gzip"):
+                before = memory_kb(server.pid, "RssAnon")
+                with PeakSampler(server.pid) as sampler:
+                    rows, last_id, wire, elapsed = download(client, "/admin/export/ledger", {"accept-encoding": encoding})
+                growth_mb = (sampler.peak["RssAnon"] - before) / 1024
+                assert rows == expected and last_id == expected, (rows, last_id, expected)
+                print(f"{encoding:<8} {rows:>12,} rows  {rows / elapsed:>9,.0f} rows/s  {wire / 2**20:>7,.1f} MiB sent  "
+                      f"server heap +{growth_mb:.1f} MiB over {before / 1024:.1f} MiB  "
+                      f"(mmap'd file peak {sampler.peak['RssFile'] / 1024:.0f} MiB)")
+                if args.max_growth_mb and growth_mb > args.max_growth_mb:
+                    over.append(f"{encoding} export grew RSS by {growth_mb:.1f} MiB > {args.max_growth_mb} MiB")
+
+            # Resuming mid-way returns exactly the rest
+            middle = expected // 2
+            rows, last_id, _, _ = download(client, f"/admin/export/ledger?after={middle}", {"accept-encoding": "gzip"})
+            assert rows == expected - middle and last_id == expected, (rows, last_id)
+            print(f"resume   after={middle:,} returned the remaining {rows:,} rows")
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    for problem in over:
+        print(f"FAIL: {problem}")
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# bench/export_order.py
+"""
+History exports stay in id order once archived rows interleave with hot ones.
+
+    python -m bench.export_order --markets 20 --users 5   # exit 1 on any misordered or missing row
+
+Every user bets on every market, round-robin, so vote ids interleave across
+markets. Then every other market is settled and archived (archive.py moves
+votes market by market, so archived ids are both lower and higher than the
+remaining hot ones) and each user downloads /profile/export/bets as CSV and
+NDJSON, whole and resumed from every ?after= id.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+
+from bench.common import use_bench_database
+
+use_bench_database("export_order.db")
+
+import httpx
+from sqlalchemy import insert, select
+
+from app import models, database, archive
+from app.main import app
+from app.migrate import migrate
+
+PASSWORD = "bench-password"
+
+
+def seed(markets, user_ids):
+    """Round-robin bets, then the even markets settled long ago and archived; returns {user_id: [vote ids]}."""
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.Market), [
+            {"question": f"Will event {i} happen?", "category": "General", "is_open": i % 2 == 1}
+            for i in range(1, markets + 1)
+        ])
+        for market_id in range(1, markets + 1):
+            conn.execute(insert(models.Vote), [
+                {"user_id": user_id, "market_id": market_id, "choice": "yes", "wager": 1} for user_id in user_ids
+            ])
+        conn.execute(insert(models.Settlement), [
+            {"market_id": market_id, "outcome": "yes", "status": "done", "finished_at": datetime(2020, 1, 1)}
+            for market_id in range(2, markets + 1, 2)
+        ])
+        ids = {user_id: sorted(conn.execute(select(models.Vote.id).where(models.Vote.user_id == user_id)).scalars())
+               for user_id in user_ids}
+
+    db = database.SessionLocal()
+    try:
+        moved = archive.archive_markets(db, datetime.utcnow() - timedelta(days=1))
+    finally:
+        db.close()
+    print(f"archived {moved['votes']} of {markets * len(user_ids)} votes ({moved['markets']} markets)")
+    return ids
+
+
+async def exported_ids(client, fmt, after=None):
+    params = {"format": fmt, **({"after": after} if after is not None else {})}
+    response = await client.get("/profile/export/bets", params=params)
+    response.raise_for_status()
+    lines = response.text.splitlines()
+    if fmt == "csv":
+        return [int(line.split(",")[0]) for line in lines[1:]]
+    return [json.loads(line)["id"] for line in lines]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--markets", type=int, default=20)
+    parser.add_argument("--users", type=int, default=5)
+    args = parser.parse_args()
+
+    migrate()
+    transport = httpx.ASGITransport(app=app)
+    clients = {}
+    for i in range(args.users):
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+        username = f"exporter{i}"
+        await client.post("/register", data={"username": username, "password": PASSWORD})
+        await client.post("/login", data={"username": username, "password": PASSWORD})
+        with database.engine.connect() as conn:
+            clients[conn.execute(select(models.User.id).where(models.User.username == username)).scalar()] = client
+    expected = seed(args.markets, list(clients))
+
+    problems = []
+    for user_id, client in clients.items():
+        ids = expected[user_id]
+        for fmt in ("csv", "ndjson"):
+            got = await exported_ids(client, fmt)
+            if got != ids:
+                problems.append(f"user {user_id} {fmt}: got {got}, expected {ids}")
+            for after in [0] + ids:
+                got = await exported_ids(client, fmt, after)
+                if got != [i for i in ids if i > after]:
+                    problems.append(f"user {user_id} {fmt} after={after}: got {got}")
+        await client.aclose()
+
+    for problem in problems[:20]:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"OK: {len(clients)} users' exports in id order, every resume point exact")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+# bench/fakes.py
+"""
+Local stand-ins for Groq and NewsAPI so benchmarks never leave the machine.
+
+    groq = FakeGroq(latency=0.3).start()    # then GROQ_BASE_URL=groq.url
+    news = FakeNews(latency=0.2).start()    # then NEWS_API_URL=news.url
+
+Both answer from a background thread after a fixed delay and count calls.
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json
+import threading
+import time
+
+
+class FakeServer:
+    path = ""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._server = None
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                fake._answer(self)
+
+            def do_POST(self):
+                fake._answer(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}{self.path}"
+
+    def _answer(self, handler):
+        self.calls += 1
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = json.loads(handler.rfile.read(length)) if length else {}
+        time.sleep(self.latency)
+        self.respond(handler, body)
+
+    def respond(self, handler, body):
+        raise NotImplementedError
+
+    @staticmethod
+    def send_json(handler, payload):
+        data = json.dumps(payload).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+class FakeGroq(FakeServer):
+    """OpenAI-style /openai/v1/chat/completions, plain and streaming."""
+
+    TOKENS = ["Smart money ", "leans YES ", "here; ", "watch the ", "news flow."]
+
+    def respond(self, handler, body):
+        if not body.get("stream"):
+            self.send_json(handler, {
+                "id": "bench", "object": "chat.completion", "created": 0, "model": body.get("model", ""),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(self.TOKENS)}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+            })
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def chunk(text):
+            data = text.encode()
+            handler.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            handler.wfile.flush()
+
+        for token in self.TOKENS:
+            chunk("data: " + json.dumps({
+                "id": "bench", "object": "chat.completion.chunk", "created": 0, "model": body.get("model", ""),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }) + "\n\n")
+        chunk("data: [DONE]\n\n")
+        handler.wfile.write(b"0\r\n\r\n")
+
+
+class FakeNews(FakeServer):
+    """NewsAPI /v2/everything with a fixed page of 20 articles."""
+
+    path = "/v2/everything"
+
+    def respond(self, handler, body):
+        self.send_json(handler, {"status": "ok", "totalResults": 20, "articles": [{
+            "source": {"id": None, "name": "Bench Wire"},
+            "author": "Bench",
+            "title": f"Synthetic headline {i}",
+            "description": "Generated for load tests.",
+            "url": f"https://example.com/{i}",
+            "urlToImage": None,
+            "publishedAt": "2024-01-01T00:00:00Z",
+            "content": "Lorem ipsum"
+        } for i in range(20)]})
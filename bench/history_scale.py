@@ -0,0 +1,111 @@
+# bench/history_scale.py
+"""
+Probability-chart reads for one market with a very long bet history.
+
+    python -m bench.history_scale --bets 1000000 --days 30
+
+Seeds price_points and price_rollups directly (the same aggregation
+history.record does per bet), then times history.series() for short and
+long ranges against reading every raw point in the range.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from bench.common import use_bench_database, add_reset_argument, reset_schema
+
+use_bench_database("history.db")
+
+from sqlalchemy import insert, select
+
+from app import models, database, history
+
+
+def seed(bets, days, rng, reset=False):
+    reset_schema(reset)
+    end = datetime.utcnow().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    step = (end - start).total_seconds() / bets
+
+    yes_pool = no_pool = 0
+    rollups = {} # (resolution, bucket_start) -> row
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.Market), [{"question": "Long-running market?", "category": "General"}])
+        batch = []
+        for i in range(bets):
+            at = start + timedelta(seconds=i * step)
+            if rng.random() < 0.5:
+                yes_pool += rng.randint(1, 100)
+            else:
+                no_pool += rng.randint(1, 100)
+            batch.append({"market_id": 1, "timestamp": at, "yes_pool": yes_pool, "no_pool": no_pool})
+            pct = history.yes_probability(yes_pool, no_pool)
+            epoch = history.to_epoch(at)
+            for seconds in history.ROLLUP_LEVELS:
+                key = (seconds, history.from_epoch(epoch - epoch % seconds))
+                row = rollups.get(key)
+                if row is None:
+                    rollups[key] = {"market_id": 1, "resolution": seconds, "bucket_start": key[1],
+                                    "yes_pool": yes_pool, "no_pool": no_pool, "low_pct": pct, "high_pct": pct, "bets": 1}
+                else:
+                    row.update(yes_pool=yes_pool, no_pool=no_pool, bets=row["bets"] + 1,
+                               low_pct=min(row["low_pct"], pct), high_pct=max(row["high_pct"], pct))
+            if len(batch) == 50000:
+                conn.execute(insert(models.PricePoint), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.PricePoint), batch)
+        conn.execute(insert(models.PriceRollup), list(rollups.values()))
+    return start, end, len(rollups)
+
+
+async def measure(label, fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = await fn()
+    per_call = (time.perf_counter() - started) / repeat
+    print(f"{label:<40} {per_call * 1000:10.1f} ms/op   {result}")
+
+
+async def run(start, end, points, repeat):
+    async with database.AsyncSessionLocal() as db:
+        for label, span in (("last hour", timedelta(hours=1)), ("last day", timedelta(days=1)), ("full range", end - start)):
+            range_start = end - span
+
+            async def chart():
+                resolution, series = await history.series(db, 1, range_start, end, points)
+                return f"{len(series)} points @ {resolution}"
+
+            async def naive():
+                rows = (await db.execute(
+                    select(models.PricePoint.timestamp, models.PricePoint.yes_pool, models.PricePoint.no_pool).where(
+                        models.PricePoint.market_id == 1,
+                        models.PricePoint.timestamp >= range_start,
+                        models.PricePoint.timestamp <= end
+                    ).order_by(models.PricePoint.timestamp)
+                )).all()
+                return f"{len(rows)} rows"
+
+            await measure(f"series() {label}", chart, repeat)
+            await measure(f"all raw points {label}", naive, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bets", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--points", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    start, end, buckets = seed(args.bets, args.days, random.Random(5), args.reset)
+    print(f"seeded {args.bets} bets ({buckets} rollup rows) in {time.perf_counter() - started:.1f}s")
+    asyncio.run(run(start, end, args.points, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
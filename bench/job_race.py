@@ -0,0 +1,153 @@
+# bench/job_race.py
+"""
+Concurrent runners of one background job must not repeat any of its work.
+
+    python -m bench.job_race --voters 2000 --runners 4   # exit 1 if a chunk was applied twice
+
+Starts --runners threads on the same job at once, the way a resume click
+during a live run, a double-submitted delete or a second CLI run would:
+a Settlement (wallets, payout transactions and the job's counters are
+checked against a single payout) and a UserDeletion of a user with a bet
+on --voters / 4 open markets (pools, counters and leftovers are checked).
+A second round sets the lease to expire immediately, so every runner
+claims the job (a takeover) and only the per-chunk compare-and-set in
+jobs.py keeps them from applying a chunk twice.
+"""
+import argparse
+import sys
+import threading
+
+from bench.common import use_bench_database, add_reset_argument, reset_schema
+
+use_bench_database("job_race.db")
+
+from sqlalchemy import func, insert, select
+
+from app import models, database, settlement, bulk, jobs
+
+WAGER = 10
+
+
+def seed_settlement(voters, reset):
+    """One market, half the voters on each side, closed and ready to pay out; returns the job id."""
+    reset_schema(reset)
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"username": f"voter{i}", "hashed_password": "x", "balance": 0} for i in range(voters)
+        ])
+        conn.execute(insert(models.Market), [{
+            "question": "Will the race be won?", "category": "General", "is_open": True,
+            "yes_pool": (voters + 1) // 2 * WAGER, "no_pool": voters // 2 * WAGER
+        }])
+        conn.execute(insert(models.Vote), [
+            {"user_id": i + 1, "market_id": 1, "choice": "yes" if i % 2 == 0 else "no", "wager": WAGER}
+            for i in range(voters)
+        ])
+    db = database.SessionLocal()
+    try:
+        return settlement.start_settlement(db, 1, "yes").id
+    finally:
+        db.close()
+
+
+def race(target, job_id, runners):
+    threads = [threading.Thread(target=target, args=(job_id,)) for _ in range(runners)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def check_settlement(voters):
+    winners, pot = (voters + 1) // 2, voters * WAGER
+    with database.engine.connect() as conn:
+        wallets = conn.execute(select(func.sum(models.User.balance))).scalar()
+        payouts = conn.execute(select(func.count(models.Transaction.id))).scalar()
+        job = conn.execute(select(models.Settlement)).one()
+    problems = []
+    if (wallets, payouts) != (pot, winners):
+        problems.append(f"wallets hold {wallets} in {payouts} payouts, expected {pot} in {winners}")
+    if (job.status, job.processed, job.paid_out) != ("done", winners, wallets):
+        problems.append(f"job says {job.status}, processed {job.processed}, paid {job.paid_out}")
+    return problems
+
+
+def seed_deletion(markets, reset):
+    """A user with a bet and a transaction on each of `markets` open markets, next to another bettor; returns the job id."""
+    reset_schema(reset)
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"username": name, "hashed_password": "x", "balance": 1000} for name in ("leaving", "staying")
+        ])
+        conn.execute(insert(models.Market), [
+            {"question": f"Will event {i} happen?", "category": "General", "is_open": True,
+             "yes_pool": 2 * WAGER, "no_pool": 0}
+            for i in range(markets)
+        ])
+        conn.execute(insert(models.Vote), [
+            {"user_id": user_id, "market_id": market_id, "choice": "yes", "wager": WAGER}
+            for market_id in range(1, markets + 1) for user_id in (1, 2)
+        ])
+        conn.execute(insert(models.Transaction), [
+            {"user_id": 1, "amount": -WAGER, "description": "Bet"} for _ in range(markets)
+        ])
+    db = database.SessionLocal()
+    try:
+        return bulk.start_deletion(db, 1).id
+    finally:
+        db.close()
+
+
+def check_deletion(markets):
+    with database.engine.connect() as conn:
+        pools = conn.execute(select(func.sum(models.Market.yes_pool))).scalar()
+        leftovers = sum(conn.execute(select(func.count(model.id)).where(model.user_id == 1)).scalar()
+                        for model in (models.Vote, models.Transaction))
+        user = conn.execute(select(models.User.id).where(models.User.id == 1)).scalar()
+        job = conn.execute(select(models.UserDeletion)).one()
+    problems = []
+    if pools != markets * WAGER:
+        problems.append(f"pools hold {pools}, expected {markets * WAGER}")
+    if leftovers or user is not None:
+        problems.append(f"user row {'still there' if user else 'gone'}, {leftovers} of their rows left")
+    if (job.status, job.processed, job.pool_removed, job.rows_deleted) != ("done", markets, markets * WAGER, markets):
+        problems.append(f"job says {job.status}, processed {job.processed}, "
+                        f"removed {job.pool_removed}, deleted {job.rows_deleted}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--voters", type=int, default=2000)
+    parser.add_argument("--runners", type=int, default=4)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    # Small chunks, so the runners really interleave
+    settlement.CHUNK_SIZE = max(1, args.voters // 50)
+    markets = max(1, args.voters // 4)
+    bulk.DELETION_CHUNK_SIZE = max(1, markets // 50)
+    cases = {
+        "settlement": (lambda: seed_settlement(args.voters, args.reset), settlement.run_settlement,
+                       lambda: check_settlement(args.voters)),
+        "deletion": (lambda: seed_deletion(markets, args.reset), bulk.run_deletion,
+                     lambda: check_deletion(markets)),
+    }
+    lease_seconds = jobs.JOB_LEASE_SECONDS
+    problems = []
+    for name, (seed, run, check) in cases.items():
+        for label, lease in (("claim", lease_seconds), ("takeover", -1)):
+            jobs.JOB_LEASE_SECONDS = lease
+            race(run, seed(), args.runners)
+            found = check()
+            print(f"{name:<10} {label:<9} {args.runners} runners  {'OK' if not found else 'FAIL'}")
+            problems += [f"{name} {label}: {problem}" for problem in found]
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
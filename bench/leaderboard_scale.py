@@ -0,0 +1,79 @@
+# bench/leaderboard_scale.py
+"""
+Leaderboard reads and updates against a large synthetic users table.
+
+    python -m bench.leaderboard_scale --users 1000000
+
+Compares the in-memory board (app.leaderboard) with the SQL it replaces:
+ORDER BY balance DESC LIMIT 10 for the top list and a COUNT(*) for a rank.
+"""
+import argparse
+import random
+import time
+
+from bench.common import use_bench_database, add_reset_argument, reset_schema
+
+use_bench_database("leaderboard.db")
+
+from sqlalchemy import func, insert, select
+
+from app import models, database
+from app.leaderboard import Leaderboard
+
+
+def seed(users, rng, reset=False):
+    reset_schema(reset)
+    with database.engine.begin() as conn:
+        for start in range(0, users, 50000):
+            conn.execute(insert(models.User), [
+                {"username": f"u{i}", "hashed_password": "x", "balance": rng.randint(0, 100000)}
+                for i in range(start, min(users, start + 50000))
+            ])
+
+
+def timed(label, fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_call = (time.perf_counter() - started) / repeat
+    print(f"{label:<34} {per_call * 1e6:12.1f} µs/op")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=200)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    started = time.perf_counter()
+    seed(args.users, rng, args.reset)
+    print(f"seeded {args.users} users in {time.perf_counter() - started:.1f}s")
+
+    db = database.SessionLocal()
+    board = Leaderboard(ttl=3600)
+    started = time.perf_counter()
+    board.rebuild(db)
+    print(f"{'board build (one scan)':<34} {time.perf_counter() - started:12.2f} s")
+
+    probe_ids = [rng.randint(1, args.users) for _ in range(args.repeat)]
+    balances = dict(db.execute(select(models.User.id, models.User.balance).where(models.User.id.in_(probe_ids))).all())
+
+    def sql_rank():
+        user_id = rng.choice(probe_ids)
+        db.execute(select(func.count()).where(models.User.balance > balances[user_id])).scalar()
+
+    timed("SQL top 10 (ORDER BY ... LIMIT)", lambda: db.execute(
+        select(models.User.id).order_by(models.User.balance.desc()).limit(10)).all(), args.repeat)
+    timed("SQL rank (COUNT balance > b)", sql_rank, max(1, args.repeat // 10))
+    timed("board top 10", lambda: board.top(10), args.repeat)
+    timed("board rank", lambda: board.rank(rng.choice(probe_ids)), args.repeat)
+    timed("board around (±2)", lambda: board.around(rng.choice(probe_ids)), args.repeat)
+    timed("board set_balance", lambda: board.set_balance(rng.choice(probe_ids), rng.randint(0, 100000)),
+          args.repeat)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bench/live_fanout.py
+"""
+Load test for live market updates: thousands of SSE viewers on one market.
+
+    python -m bench.live_fanout --subscribers 2000 --updates 500 --rate 200
+
+Serves the app with uvicorn inside this process and opens real SSE
+connections to /predict/1/stream, then publishes a burst of pool updates
+straight into app.live.hub (the same hub the server uses). Reports how
+many messages each viewer received after coalescing and the delay from
+publish to delivery.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from bench.common import use_bench_database, percentile, free_port
+
+use_bench_database("live_fanout.db")
+
+import httpx
+import uvicorn
+
+from app import models, database, live
+from app.main import app
+
+
+async def viewer(client, url, delays):
+    async with client.stream("GET", url) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            payload = json.loads(line[5:])
+            if "sent_at" in payload:
+                delays.append((time.perf_counter() - payload["sent_at"]) * 1000)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=500, help="pool updates to publish")
+    parser.add_argument("--rate", type=float, default=200, help="updates per second")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    db.add(models.Market(question="Hot market?", category="Crypto", is_open=True))
+    db.commit()
+    db.close()
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", backlog=args.subscribers))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    delays = []
+    limits = httpx.Limits(max_connections=args.subscribers + 10)
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        url = f"http://127.0.0.1:{port}/predict/1/stream"
+        viewers = [asyncio.create_task(viewer(client, url, delays)) for _ in range(args.subscribers)]
+        started = time.perf_counter()
+        while live.hub.subscriber_count(1) < args.subscribers:
+            await asyncio.sleep(0.05)
+        print(f"{args.subscribers} viewers connected in {time.perf_counter() - started:.1f}s")
+
+        yes_pool = no_pool = 0
+        started = time.perf_counter()
+        for i in range(args.updates):
+            if i % 2:
+                yes_pool += 10
+            else:
+                no_pool += 10
+            snapshot = live.market_snapshot(1, yes_pool, no_pool)
+            snapshot["sent_at"] = time.perf_counter()
+            live.hub.publish(snapshot)
+            await asyncio.sleep(1 / args.rate)
+        publish_time = time.perf_counter() - started
+        await asyncio.sleep(live.hub.window * 2 + 1)
+
+        for task in viewers:
+            task.cancel()
+        await asyncio.gather(*viewers, return_exceptions=True)
+
+    server.should_exit = True
+    await server_task
+
+    per_viewer = len(delays) / args.subscribers
+    print(f"published {args.updates} updates in {publish_time:.1f}s; hub flushed {live.hub.flushed} times "
+          f"(window {live.hub.window}s)")
+    print(f"delivered {len(delays)} messages, {per_viewer:.1f} per viewer")
+    print(f"publish->receive delay: p50 {percentile(delays, 50):.0f} ms   p99 {percentile(delays, 99):.0f} ms   "
+          f"max {max(delays, default=float('nan')):.0f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+# bench/profile_queries.py
+"""
+SQL statements per /profile render as a user's history grows.
+
+    python -m bench.profile_queries --sizes 1,10,100,1000   # exit 1 if the count isn't constant
+
+Seeds one user per size with that many bets (each on its own market, with
+its transaction) plus as many archived ones, then loads /profile for each
+and reads the statement count from the Server-Timing header, i.e.
+metrics.RequestTimings.db_count. Joined bet+market pages mean the count
+must not depend on the number of bets.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+from datetime import datetime
+
+from bench.common import use_bench_database
+
+use_bench_database("profile_queries.db")
+os.environ["METRICS_SERVER_TIMING"] = "1"
+
+import httpx
+from sqlalchemy import insert
+
+from app import models, database
+from app.main import app
+from app.migrate import migrate
+
+PASSWORD = "bench-password"
+
+
+def seed_history(user_id, size, first_market_id):
+    """`size` hot and `size` archived bets for one user, each on a new market."""
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.Market), [
+            {"question": f"Will event {first_market_id + i} happen?", "category": "General", "is_open": i % 2 == 0}
+            for i in range(2 * size)
+        ])
+        for model, offset in ((models.Vote, 0), (models.ArchivedVote, size)):
+            conn.execute(insert(model), [
+                {"user_id": user_id, "market_id": first_market_id + offset + i, "choice": "yes", "wager": 1}
+                for i in range(size)
+            ])
+        for model in (models.Transaction, models.ArchivedTransaction):
+            conn.execute(insert(model), [
+                {"user_id": user_id, "amount": -1, "description": "Bet", "timestamp": datetime.utcnow()}
+                for _ in range(size)
+            ])
+
+
+def statements(response):
+    response.raise_for_status()
+    return int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1,10,100,1000", help="bets per user, comma-separated")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    migrate()
+    counts = {}
+    next_market_id = 1
+    transport = httpx.ASGITransport(app=app)
+    for size in sizes:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            username = f"profile{size}"
+            await client.post("/register", data={"username": username, "password": PASSWORD})
+            await client.post("/login", data={"username": username, "password": PASSWORD})
+            with database.engine.connect() as conn:
+                user_id = conn.execute(
+                    models.User.__table__.select().where(models.User.username == username)
+                ).first().id
+            seed_history(user_id, size, next_market_id)
+            next_market_id += 2 * size
+
+            first_page = statements(await client.get("/profile"))
+            older_page = statements(await client.get("/profile?bets_before=999999999&txns_before=999999999"))
+            counts[size] = (first_page, older_page)
+            print(f"{size:>6} bets   /profile {first_page} statements   cursor page {older_page} statements")
+
+    if len(set(counts.values())) > 1:
+        print(f"FAIL: statement count depends on history size: {counts}")
+        sys.exit(1)
+    print("OK: statement count is constant")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
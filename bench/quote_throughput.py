@@ -0,0 +1,138 @@
+# bench/quote_throughput.py
+"""
+Payout-preview throughput: quotes/sec in-process and over HTTP.
+
+    python -m bench.quote_throughput --markets 10000
+
+In-process, quotes.quote() over the pool snapshot is timed against the
+naive alternative of one pool lookup query per quote. Over HTTP, a real
+uvicorn worker serves POST /api/quotes to concurrent clients sending
+batches of 1 and 100 quotes.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="predicthub-quotes-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(WORKDIR, "quotes.db")
+
+import httpx
+from sqlalchemy import insert, select
+
+from app import models, database, quotes, settlement
+from app.migrate import migrate
+from bench.common import percentile, free_port
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(markets, rng):
+    migrate()
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.Market), [{
+            "question": f"Will event {i} happen?", "category": "General",
+            "yes_pool": rng.randint(0, 50000), "no_pool": rng.randint(0, 50000), "is_open": True
+        } for i in range(markets)])
+
+
+def batch(rng, markets, size):
+    return [{"market_id": rng.randint(1, markets), "choice": rng.choice(("yes", "no")), "wager": rng.randint(1, 500)}
+            for _ in range(size)]
+
+
+def per_query(items):
+    """The no-snapshot baseline: one pool lookup per quote."""
+    db = database.SessionLocal()
+    try:
+        results = []
+        for item in items:
+            yes_pool, no_pool = db.execute(
+                select(models.Market.yes_pool, models.Market.no_pool).where(models.Market.id == item["market_id"])
+            ).one()
+            winning = (yes_pool if item["choice"] == "yes" else no_pool) + item["wager"]
+            results.append(settlement.payout(item["wager"], yes_pool + no_pool + item["wager"], winning))
+        return results
+    finally:
+        db.close()
+
+
+def in_process(rng, markets, total):
+    db = database.SessionLocal()
+    quotes.snapshot.rebuild(db)
+    db.close()
+    for size in (1, 100, 1000):
+        batches = [batch(rng, markets, size) for _ in range(max(1, total // size))]
+        started = time.perf_counter()
+        for items in batches:
+            quotes.quote(items)
+        elapsed = time.perf_counter() - started
+        print(f"snapshot, batch {size:>4}        {len(batches) * size / elapsed:>12,.0f} quotes/s")
+
+    items = batch(rng, markets, min(total, 5000))
+    started = time.perf_counter()
+    per_query(items)
+    print(f"query per quote              {len(items) / (time.perf_counter() - started):>12,.0f} quotes/s")
+
+
+async def over_http(rng, markets, clients, duration):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO, env=dict(os.environ, PYTHONPATH=REPO), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/login")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+
+            for size in (1, 100):
+                payloads = [{"quotes": batch(rng, markets, size)} for _ in range(200)]
+                latencies = []
+                deadline = time.perf_counter() + duration
+
+                async def worker(offset):
+                    i = offset
+                    while time.perf_counter() < deadline:
+                        started = time.perf_counter()
+                        response = await client.post("/api/quotes", json=payloads[i % len(payloads)])
+                        response.raise_for_status()
+                        latencies.append((time.perf_counter() - started) * 1000)
+                        i += 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker(n) for n in range(clients)))
+                elapsed = time.perf_counter() - started
+                print(f"HTTP, batch {size:>4}, {clients} clients  {len(latencies) * size / elapsed:>9,.0f} quotes/s   "
+                      f"{len(latencies) / elapsed:>7,.0f} req/s   p50 {percentile(latencies, 50):.1f} ms   "
+                      f"p99 {percentile(latencies, 99):.1f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--markets", type=int, default=10000)
+    parser.add_argument("--quotes", type=int, default=200000, help="in-process quotes per batch size")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per HTTP case")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    seed(args.markets, rng)
+    in_process(rng, args.markets, args.quotes)
+    asyncio.run(over_http(rng, args.markets, args.clients, args.duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# bench/route_throughput.py
+"""
+Requests/sec and latency on /markets and /predict/{id} under concurrent load.
+
+    python -m bench.route_throughput                     # this tree
+    python -m bench.route_throughput --compare HEAD~1    # this checkout vs an older commit
+
+Seeds one SQLite file, then serves it with a real uvicorn worker per tree so
+the numbers include event-loop blocking exactly as production sees it.
+--compare checks the given revision out into a temporary git worktree and
+runs the same load against a copy of the same database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="predicthub-bench-")
+SEED_DB = os.path.join(WORKDIR, "seed.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + SEED_DB
+
+import httpx
+
+from bench.common import percentile, free_port
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(markets, users, votes_per_market, comments_per_market):
+    from app import models, database
+
+    models.Base.metadata.create_all(bind=database.engine)
+    rng = random.Random(7)
+    db = database.SessionLocal()
+    db.add_all(models.User(username=f"user{i}", hashed_password="x", balance=1000) for i in range(users))
+    db.add_all(
+        models.Market(question=f"Will event {i} happen?", description="Synthetic", category="Crypto",
+                      yes_pool=rng.randint(0, 5000), no_pool=rng.randint(0, 5000), is_open=i % 3 != 0)
+        for i in range(markets)
+    )
+    db.flush()
+    for market_id in range(1, markets + 1):
+        voters = rng.sample(range(1, users + 1), min(users, votes_per_market))
+        db.add_all(models.Vote(user_id=u, market_id=market_id, choice=rng.choice(("yes", "no")),
+                               wager=rng.randint(1, 100)) for u in voters)
+        db.add_all(models.Comment(content="gm", user_id=rng.randint(1, users), market_id=market_id)
+                   for _ in range(comments_per_market))
+    db.commit()
+    db.close()
+    # Closing the last connection checkpoints the WAL (SQLite profile), so the
+    # copies run_tree makes of the seed file hold every row
+    database.engine.dispose()
+
+
+async def hammer(base_url, path, clients, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                # A wedged server (e.g. pool exhaustion) shows up here, not as a crash
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=10) as client:
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+
+    if not latencies:
+        return {"requests_per_sec": 0, "p50_ms": None, "p99_ms": None, "errors": errors}
+    return {
+        "requests_per_sec": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "errors": errors
+    }
+
+
+def run_tree(tree, db_path, paths, clients, duration):
+    """Serves `tree` with uvicorn on a private DB copy and loads each path in turn."""
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL="sqlite:///" + db_path, PYTHONPATH=tree)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=tree, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(base_url + "/markets", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        return {path: asyncio.run(hammer(base_url, path, clients, duration)) for path in paths}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per route")
+    parser.add_argument("--markets", type=int, default=500)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=50, help="votes per market")
+    parser.add_argument("--comments", type=int, default=20, help="comments per market")
+    parser.add_argument("--compare", metavar="REV", help="also benchmark this git revision")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    seed(args.markets, args.users, args.votes, args.comments)
+    paths = ["/markets", "/predict/1"]
+
+    trees = {"worktree": REPO}
+    if args.compare:
+        trees[args.compare] = os.path.join(WORKDIR, "compare")
+        subprocess.run(["git", "worktree", "add", "--detach", trees[args.compare], args.compare],
+                       cwd=REPO, check=True, capture_output=True)
+
+    results = {}
+    try:
+        for label, tree in trees.items():
+            db_copy = os.path.join(WORKDIR, f"{len(results)}.db")
+            shutil.copy(SEED_DB, db_copy)
+            results[label] = run_tree(tree, db_copy, paths, args.clients, args.duration)
+    finally:
+        if args.compare:
+            subprocess.run(["git", "worktree", "remove", "--force", trees[args.compare]], cwd=REPO)
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for label, by_path in results.items():
+        for path, stats in by_path.items():
+            print(f"{label:<10} {path:<12} {stats['requests_per_sec']:>8} req/s   "
+                  f"p50 {stats['p50_ms']:>8} ms   p99 {stats['p99_ms']:>8} ms   errors {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# bench/search_scale.py
+"""
+User and market search against a large table.
+
+    python -m bench.search_scale --users 1000000 --markets 50000
+
+Seeds users and markets (the search triggers index them as they land),
+then times the old admin filter, LIKE '%x%' over every username, against
+search.search_users, and a LIKE scan over questions and descriptions
+against search.search_markets. Reports the median and p95 of the first
+page for a set of queries.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from bench.common import use_bench_database, add_reset_argument, reset_schema, percentile
+
+use_bench_database("search.db")
+
+from sqlalchemy import insert, select, or_
+
+from app import models, database, search
+from app.migrate import migrate
+
+SYLLABLES = ["ka", "ri", "to", "mo", "sa", "len", "dar", "vi", "no", "zu", "pe", "qua", "ash", "bel", "cor", "fin"]
+TOPICS = ["bitcoin", "election", "rain", "championship", "inflation", "launch", "merger", "senate", "storm", "ethereum",
+          "playoffs", "interest", "rates", "earnings", "tariff", "heatwave", "summit", "referendum", "satellite", "drought"]
+
+
+def vocabulary(rng, size=20000):
+    """Topic words plus synthetic ones, most frequent first (drawn Zipf-like below)."""
+    words = set(TOPICS)
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return TOPICS + sorted(words - set(TOPICS))
+
+
+def zipf_word(rng, vocab):
+    return vocab[min(len(vocab) - 1, int(rng.paretovariate(1.1)) - 1)]
+
+
+def seed(users, markets, rng, reset=False):
+    reset_schema(reset)
+    migrate()
+    with database.engine.begin() as conn:
+        batch = []
+        for i in range(users):
+            name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + str(i)
+            batch.append({"username": name, "hashed_password": "x", "balance": 1000})
+            if len(batch) == 50000:
+                conn.execute(insert(models.User), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.User), batch)
+        vocab = vocabulary(rng)
+        conn.execute(insert(models.Market), [{
+            "question": "Will " + " ".join(rng.choice(vocab) for _ in range(4)) + f" happen by {2025 + i % 5}?",
+            "description": " ".join(zipf_word(rng, vocab) for _ in range(30)),
+            "category": "General"
+        } for i in range(markets)])
+
+
+async def measure(queries, fn):
+    """Per-query milliseconds; `fn` is a sync function or a search coroutine taking (db, q)."""
+    samples = []
+    for q in queries:
+        started = time.perf_counter()
+        if asyncio.iscoroutinefunction(fn):
+            async with database.AsyncSessionLocal() as db:
+                await fn(db, q)
+        else:
+            fn(q)
+        samples.append((time.perf_counter() - started) * 1000)
+    return sorted(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--markets", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=20, help="distinct queries per case")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the database in BENCH_DATABASE_URL")
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    if not args.no_seed:
+        started = time.perf_counter()
+        seed(args.users, args.markets, rng, args.reset)
+        print(f"seeded {args.users} users, {args.markets} markets in {time.perf_counter() - started:.1f}s")
+
+    user_queries = ["".join(rng.choice(SYLLABLES) for _ in range(2)) + str(rng.randint(1, 999)) for _ in range(args.queries)]
+    # A word prefix from a real question, sometimes with a second word: as a user would type it
+    with database.engine.connect() as conn:
+        questions = conn.execute(select(models.Market.question).order_by(models.Market.id).limit(5000)).scalars().all()
+    market_queries = []
+    for _ in range(args.queries):
+        picked = search.words(rng.choice(questions))[1:5]
+        market_queries.append(" ".join(rng.sample(picked, rng.randint(1, 2)))[:-1])
+
+    def old_user_filter(q):
+        # What admin_users_dashboard ran before: every match, ordered by id
+        db = database.SessionLocal()
+        try:
+            return db.execute(select(models.User).where(models.User.username.contains(q)).order_by(models.User.id.asc())).scalars().all()
+        finally:
+            db.close()
+
+    def like_markets(q):
+        db = database.SessionLocal()
+        try:
+            conditions = [or_(models.Market.question.ilike(f"%{w}%"), models.Market.description.ilike(f"%{w}%"))
+                          for w in search.words(q)]
+            return db.execute(select(models.Market).where(*conditions).order_by(models.Market.id).limit(search.SEARCH_PAGE_SIZE)).scalars().all()
+        finally:
+            db.close()
+
+    rows = [
+        ("users: LIKE '%x%' (old admin filter)", await measure(user_queries, old_user_filter)),
+        ("users: search_users, first page", await measure(user_queries, search.search_users)),
+        ("markets: LIKE scan, first page", await measure(market_queries, like_markets)),
+        ("markets: search_markets, first page", await measure(market_queries, search.search_markets)),
+    ]
+    for name, samples in rows:
+        print(f"{name:<40} median {statistics.median(samples):>9.2f} ms   p95 {percentile(samples, 95):>9.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,330 @@
+# bench/suite.py
+"""
+End-to-end load test: a realistic route mix against a seeded database.
+
+    python -m bench.suite                                  # default scale and mix
+    python -m bench.suite --users 20000 --markets 2000 --clients 32 --duration 60
+    python -m bench.suite --mix "markets=50,predict=30,bet=20"
+    python -m bench.suite --diff bench-results/a.json bench-results/b.json
+
+Seeds users, markets, votes, transactions and comments, serves the app
+with a real uvicorn worker, points Groq and NewsAPI at the local fakes in
+bench/fakes.py, and drives weighted operations from logged-in clients.
+Each run is written to bench-results/<time>-<commit>.json (or --out) with
+its settings, commit and per-operation throughput and latency percentiles,
+so runs on different commits can be compared with --diff.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from bench.common import use_bench_database, add_reset_argument, reset_schema, percentile, free_port
+
+use_bench_database("suite.db")
+
+import bcrypt
+import httpx
+from sqlalchemy import insert
+
+from bench.fakes import FakeGroq, FakeNews
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "benchpass"
+ADMIN = "bench_admin"
+
+# Operation -> weight. "bet" is POST /predict/{id}, "resolve" is /admin/resolve/{id}.
+DEFAULT_MIX = {
+    "markets": 25, "predict": 25, "bet": 12, "profile": 10, "leaderboard": 10,
+    "login": 4, "news": 5, "analyze": 5, "comments": 3, "resolve": 1
+}
+
+
+# --- SEEDING ---
+def seed(users, markets, votes_per_market, comments_per_market, rng, reset=False):
+    """Bulk-inserts a consistent ledger: pools equal the votes, balances equal the transactions."""
+    from app import models, database
+
+    reset_schema(reset)
+    # One real hash shared by every account: logins cost real bcrypt time
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt()).decode()
+    balances = [1000] * (users + 1)
+    categories = ["General", "Sports", "Crypto", "Politics", "Tech", "Weather"]
+
+    market_rows, vote_rows, txn_rows, comment_rows = [], [], [], []
+    for market_id in range(1, markets + 1):
+        question = f"Will synthetic event {market_id} happen?"
+        pools = {"yes": 0, "no": 0}
+        for user_id in rng.sample(range(1, users + 1), min(users, votes_per_market)):
+            choice = rng.choice(("yes", "no"))
+            wager = rng.randint(1, min(100, balances[user_id])) if balances[user_id] > 0 else 0
+            if wager == 0:
+                continue
+            balances[user_id] -= wager
+            pools[choice] += wager
+            vote_rows.append({"user_id": user_id, "market_id": market_id, "choice": choice, "wager": wager})
+            txn_rows.append({"user_id": user_id, "amount": -wager, "description": f"Bet on {question} ({choice.upper()})"})
+        comment_rows += [
+            {"user_id": rng.randint(1, users), "market_id": market_id, "content": f"Take #{i} on this one"}
+            for i in range(comments_per_market)
+        ]
+        market_rows.append({
+            "question": question, "description": "Seeded by bench.suite", "category": rng.choice(categories),
+            "yes_pool": pools["yes"], "no_pool": pools["no"], "is_open": rng.random() < 0.8
+        })
+
+    with database.engine.begin() as conn:
+        for rows_of, rows in (
+            (models.User, [{"username": ADMIN if i == 1 else f"bench{i}", "hashed_password": hashed,
+                            "balance": balances[i]} for i in range(1, users + 1)]),
+            (models.Transaction, [{"user_id": i, "amount": 1000, "description": "Welcome Bonus 🎁"}
+                                  for i in range(1, users + 1)]),
+            (models.Market, market_rows),
+            (models.Vote, vote_rows),
+            (models.Transaction, txn_rows),
+            (models.Comment, comment_rows),
+        ):
+            for start in range(0, len(rows), 20000):
+                conn.execute(insert(rows_of), rows[start:start + 20000])
+    return {"users": users, "markets": markets, "votes": len(vote_rows),
+            "transactions": users + len(txn_rows), "comments": len(comment_rows)}
+
+
+# --- LOAD ---
+class Session:
+    """One simulated browser: its own cookie jar, logged in as one seeded user."""
+
+    def __init__(self, base_url, username, limits):
+        self.username = username
+        self.client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30)
+        # Cookie-less twin for the "login" operation, so it never replaces this session's login
+        self.anonymous = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30)
+
+    async def login(self):
+        response = await self.client.post("/login", data={"username": self.username, "password": PASSWORD})
+        if response.status_code != 303:
+            raise RuntimeError(f"login as {self.username} failed: {response.status_code}")
+
+
+def operations(users, markets):
+    """Operation name -> coroutine factory taking (session, rng, admin) and returning a response."""
+    def market_id(rng):
+        return rng.randint(1, markets)
+
+    async def fresh_login(session, rng, admin):
+        # As a new browser would: pays for bcrypt every time
+        session.anonymous.cookies.clear()
+        return await session.anonymous.post("/login", data={
+            "username": f"bench{rng.randint(2, users)}", "password": PASSWORD
+        })
+
+    return {
+        "markets": lambda s, rng, admin: s.client.get("/markets"),
+        "predict": lambda s, rng, admin: s.client.get(f"/predict/{market_id(rng)}"),
+        "bet": lambda s, rng, admin: s.client.post(
+            f"/predict/{market_id(rng)}", data={"choice": rng.choice(("yes", "no")), "wager": rng.randint(1, 20)}
+        ),
+        "profile": lambda s, rng, admin: s.client.get("/profile"),
+        "leaderboard": lambda s, rng, admin: s.client.get("/leaderboard"),
+        "login": fresh_login,
+        "news": lambda s, rng, admin: s.client.get("/news", params={
+            "category": rng.choice(("general", "business", "technology", "sports", "bollywood", "politics"))
+        }),
+        "analyze": lambda s, rng, admin: s.client.post(f"/api/analyze/{market_id(rng)}"),
+        "comments": lambda s, rng, admin: s.client.get(f"/api/markets/{market_id(rng)}/comments"),
+        "resolve": lambda s, rng, admin: admin.client.post(
+            f"/admin/resolve/{market_id(rng)}", data={"outcome": rng.choice(("yes", "no"))}
+        ),
+    }
+
+
+def summarize(samples, duration):
+    latencies = sorted(ms for ms, _ in samples)
+    # None rather than nan for an op that never ran: the report is JSON
+    pick = lambda pct: round(percentile(latencies, pct), 2) if latencies else None
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": len(samples),
+        "requests_per_sec": round(len(samples) / duration, 1),
+        "p50_ms": pick(50),
+        "p90_ms": pick(90),
+        "p99_ms": pick(99),
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+        # 4xx are business outcomes here (already bet, market closed); 5xx and
+        # transport failures ("error") are what a regression looks like
+        "errors": sum(n for status, n in statuses.items() if status == "error" or status.startswith("5")),
+        "statuses": statuses
+    }
+
+
+async def drive(base_url, mix, clients, duration, users, markets, seed_value):
+    limits = httpx.Limits(max_connections=4)
+    ops = operations(users, markets)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    admin = Session(base_url, ADMIN, limits)
+    sessions = [Session(base_url, f"bench{2 + i % (users - 1)}", limits) for i in range(clients)]
+    for session in [admin] + sessions:
+        await session.login()
+
+    samples = {name: [] for name in names}
+    deadline = time.perf_counter() + duration
+
+    async def worker(session, rng):
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = (await ops[name](session, rng, admin)).status_code
+            except httpx.HTTPError:
+                status = "error"
+            samples[name].append(((time.perf_counter() - started) * 1000, status))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(s, random.Random(seed_value + i)) for i, s in enumerate(sessions)))
+    elapsed = time.perf_counter() - started
+
+    for session in [admin] + sessions:
+        await session.client.aclose()
+        await session.anonymous.aclose()
+    everything = [sample for name in names for sample in samples[name]]
+    return elapsed, {"all": summarize(everything, elapsed), **{name: summarize(samples[name], elapsed) for name in names}}
+
+
+def serve(env, log_path=None):
+    port = free_port()
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO, env=env, stdout=log, stderr=log
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(base_url + "/login", timeout=1)
+            return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except OSError:
+        return "unknown"
+
+
+# --- REPORTING ---
+def print_results(results):
+    for name, stats in results["operations"].items():
+        print(f"{name:<12} {stats['requests_per_sec']:>8} req/s   p50 {stats['p50_ms']!s:>8} ms   "
+              f"p90 {stats['p90_ms']!s:>8} ms   p99 {stats['p99_ms']!s:>8} ms   errors {stats['errors']}")
+
+def diff(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['commit']} -> {after['commit']}")
+    for name, new in after["operations"].items():
+        old = before["operations"].get(name)
+        if not old or not old["requests_per_sec"] or not old["p99_ms"] or new["p99_ms"] is None:
+            continue
+        print(f"{name:<12} req/s {old['requests_per_sec']:>8} -> {new['requests_per_sec']:>8} "
+              f"({(new['requests_per_sec'] / old['requests_per_sec'] - 1) * 100:+.0f}%)   "
+              f"p99 {old['p99_ms']:>8} -> {new['p99_ms']:>8} ms ({(new['p99_ms'] / old['p99_ms'] - 1) * 100:+.0f}%)")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise SystemExit(f"unknown operation {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--markets", type=int, default=300)
+    parser.add_argument("--votes", type=int, default=50, help="votes per market")
+    parser.add_argument("--comments", type=int, default=20, help="comments per market")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent logged-in clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--mix", help="operation weights, e.g. markets=50,bet=50 (default: %s)" %
+                        ",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()))
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="fake Groq response delay, seconds")
+    parser.add_argument("--news-latency", type=float, default=0.2, help="fake NewsAPI response delay, seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-log", help="write the server's output (tracebacks of 5xx) here")
+    parser.add_argument("--out", help="results file (default bench-results/<time>-<commit>.json)")
+    parser.add_argument("--diff", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two results files and exit")
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    if args.diff:
+        diff(*args.diff)
+        return
+    mix = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+
+    started = time.perf_counter()
+    seeded = seed(args.users, args.markets, args.votes, args.comments, random.Random(args.seed), args.reset)
+    print(f"seeded {seeded} in {time.perf_counter() - started:.1f}s")
+
+    groq = FakeGroq(latency=args.llm_latency).start()
+    news = FakeNews(latency=args.news_latency).start()
+    env = dict(
+        os.environ, PYTHONPATH=REPO, ADMIN_USERNAME=ADMIN,
+        GROQ_API_KEY="bench", GROQ_BASE_URL=groq.url, NEWS_API_KEY="bench", NEWS_API_URL=news.url
+    )
+    server, base_url = serve(env, args.server_log)
+    try:
+        elapsed, by_operation = asyncio.run(
+            drive(base_url, mix, args.clients, args.duration, args.users, args.markets, args.seed)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+        groq.stop()
+        news.stop()
+
+    commit = git_revision()
+    results = {
+        "commit": commit,
+        "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "settings": {**vars(args), "mix": mix},
+        "seeded": seeded,
+        "elapsed_sec": round(elapsed, 2),
+        "upstream_calls": {"groq": groq.calls, "news": news.calls},
+        "operations": by_operation
+    }
+    out = args.out or os.path.join(REPO, "bench-results", f"{datetime.utcnow():%Y%m%d-%H%M%S}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print_results(results)
+    print(f"upstream calls: {results['upstream_calls']}")
+    print(f"saved {out}")
+
+
+if __name__ == "__main__":
+    main()
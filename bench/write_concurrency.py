@@ -0,0 +1,140 @@
+# bench/write_concurrency.py
+"""
+Parallel bets with concurrent page reads, once per engine profile.
+
+    python -m bench.write_concurrency                              # SQLite: plain vs sqlite
+    python -m bench.write_concurrency --profiles plain,postgres,pgbouncer --reset   # with BENCH_DATABASE_URL set
+
+Each profile runs in a fresh interpreter (DB_PROFILE is read at import)
+against a freshly seeded database: writer threads place bets through
+betting.place_bet while reader threads keep running the /markets and
+profile queries, the mix that produces "database is locked" on an
+untuned SQLite file. Reports bets/s, latency percentiles and how many
+bets failed on "database is locked" or a pool checkout timeout.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from bench.common import add_reset_argument, percentile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(args):
+    """Runs inside the per-profile interpreter and prints one JSON line."""
+    import random
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from bench.common import use_bench_database
+    use_bench_database("writes.db")
+
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeout
+
+    from app import models, database, betting
+    from bench.bet_stress import seed
+
+    user_ids, market_ids = seed(args.users, args.markets, 1000, args.reset)
+    rng = random.Random(9)
+    jobs = [(rng.choice(user_ids), rng.choice(market_ids), rng.choice(("yes", "no")), rng.randint(1, 50))
+            for _ in range(args.bets)]
+
+    done = threading.Event()
+    reads = [0]
+
+    def reader():
+        while not done.is_set():
+            db = database.SessionLocal()
+            try:
+                # Long enough to hold a read lock while writers queue up behind it
+                db.execute(select(models.Market).order_by(models.Market.is_open.desc(), models.Market.id.desc()).limit(40)).all()
+                db.execute(select(models.Vote).join(models.Vote.market).where(models.Vote.user_id == rng.choice(user_ids))).all()
+                db.execute(select(models.Transaction).where(models.Transaction.user_id == rng.choice(user_ids))).all()
+                reads[0] += 1
+            except OperationalError:
+                pass
+            finally:
+                db.close()
+
+    def place(job):
+        db = database.SessionLocal()
+        started = time.perf_counter()
+        try:
+            betting.place_bet(db, *job)
+            outcome = "accepted"
+        except betting.BetRejected:
+            outcome = "rejected"
+        except OperationalError:
+            db.rollback()
+            outcome = "locked"
+        except PoolTimeout:
+            outcome = "pool_timeout"
+        finally:
+            db.close()
+        return outcome, (time.perf_counter() - started) * 1000
+
+    readers = [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in readers:
+        thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.writers) as pool:
+        results = list(pool.map(place, jobs))
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    latencies = sorted(ms for _, ms in results)
+    pick = lambda pct: round(percentile(latencies, pct), 1)
+    print(json.dumps({
+        "profile": database.DB_PROFILE,
+        "bets_per_sec": round(len(jobs) / elapsed, 1),
+        "p50_ms": pick(50), "p99_ms": pick(99), "max_ms": round(latencies[-1], 1),
+        "accepted": sum(1 for o, _ in results if o == "accepted"),
+        "rejected": sum(1 for o, _ in results if o == "rejected"),
+        "locked": sum(1 for o, _ in results if o == "locked"),
+        "pool_timeout": sum(1 for o, _ in results if o == "pool_timeout"),
+        "reads_per_sec": round(reads[0] / elapsed, 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profiles", default="plain,sqlite", help="comma-separated DB_PROFILE values")
+    parser.add_argument("--bets", type=int, default=3000)
+    parser.add_argument("--writers", type=int, default=10)
+    # writers + readers stay under the default 5 + 10 connection pool, so only locking differs
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--markets", type=int, default=50)
+    add_reset_argument(parser)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    for profile in args.profiles.split(","):
+        # Each child picks its own throwaway file (or BENCH_DATABASE_URL)
+        env = dict(os.environ, DB_PROFILE=profile, PYTHONPATH=REPO)
+        output = subprocess.run(
+            [sys.executable, "-m", "bench.write_concurrency", "--child"] + sys.argv[1:],
+            cwd=REPO, env=env, capture_output=True, text=True
+        )
+        line = output.stdout.strip().splitlines()[-1] if output.stdout.strip() else ""
+        if output.returncode != 0 or not line.startswith("{"):
+            print(f"{profile:<10} failed:\n{output.stderr[-2000:]}")
+            continue
+        r = json.loads(line)
+        print(f"{profile:<10} {r['bets_per_sec']:>8} bets/s   p50 {r['p50_ms']:>8} ms   p99 {r['p99_ms']:>8} ms   "
+              f"locked {r['locked']:>4}   pool timeouts {r['pool_timeout']:>4}   accepted {r['accepted']}   reads {r['reads_per_sec']}/s")
+
+
+if __name__ == "__main__":
+    main()